@@ -27,6 +27,9 @@ class PicoPotGUI:
         self.is_unlocked = False
         self.sol_price = 0.0  # SOL to USD price
         self.price_loading = True
+        # Last balance pushed by the wallet's balance tracker
+        self.balance = None
+        self.balance_address = "..."
         
         # Create welcome screen first
         self.create_welcome_screen()
@@ -57,8 +60,8 @@ class PicoPotGUI:
                     self.sol_price = new_price
                     self.price_loading = False
                     # Update USD value if wallet is unlocked
-                    if self.is_unlocked:
-                        self.root.after(0, self.refresh_balance)
+                    if self.is_unlocked and self.balance is not None:
+                        self.root.after(0, lambda: self.display_balance(self.balance, self.balance_address))
                 except Exception as e:
                     print(f"Price update error: {e}")
                 # Update every 30 seconds
@@ -77,6 +80,8 @@ class PicoPotGUI:
                     self.root.after(0, lambda p=progress: self.update_loading(p))
                 
                 self.wallet = wallet()
+                self.wallet.tracker.add_callback(
+                    lambda signature, status: self.root.after(0, lambda: self.on_transaction_status(signature, status)))
                 self.root.after(0, self.show_password_screen)
             except Exception as e:
                 self.root.after(0, lambda: messagebox.showerror("Connection Error", f"Failed to connect to Pico: {e}"))
@@ -224,11 +229,15 @@ class PicoPotGUI:
         
         def unlock_thread():
             try:
-                private_key = self.wallet.get_privatekey(password)
-                if private_key and private_key != "wrongpass":
+                result = self.wallet.unlock(password)
+                if result == "unlocked":
                     self.root.after(0, self.show_main_ui)
-                else:
+                elif result == "wrongpass":
                     self.root.after(0, lambda: self.error_label.configure(text="Wrong password!"))
+                elif result == "timeout":
+                    self.root.after(0, lambda: self.error_label.configure(text="Device did not answer in time, try again"))
+                else:
+                    self.root.after(0, lambda: self.error_label.configure(text=f"Error: {result}"))
             except Exception as e:
                 self.root.after(0, lambda: self.error_label.configure(text=f"Error: {str(e)}"))
         
@@ -343,8 +352,16 @@ class PicoPotGUI:
         # Load balance initially
         self.refresh_balance()
     
+    def on_transaction_status(self, signature, status):
+        """Confirmation updates for sent transactions, on the Tk thread"""
+        print(f"Transaction {signature[:8]}...: {status}")
+        if status == "expired":
+            messagebox.showerror("Transaction expired", f"❌ Transaction {signature[:16]}... was not included in time.\nNo funds were moved, please send it again.")
+        elif status.startswith("failed"):
+            messagebox.showerror("Transaction failed", f"❌ Transaction {signature[:16]}... failed:\n{status}")
+    
     def refresh_balance(self):
-        """Refresh balance in background"""
+        """Load the balance in background, then follow it through the balance tracker"""
         def refresh():
             try:
                 wallet_info = self.wallet.get_walletinfo()
@@ -352,6 +369,9 @@ class PicoPotGUI:
                     balance = wallet_info["balance"]
                     address = wallet_info["address"][:8] + "..." + wallet_info["address"][-6:]
                     self.root.after(0, lambda: self.display_balance(balance, address))
+                    # Pushed on every change from now on, no polling
+                    self.wallet.balance_tracker.watch(wallet_info["address"],
+                        lambda new_balance: self.root.after(0, lambda: self.display_balance(new_balance, address)))
                 else:
                     self.root.after(0, lambda: self.display_balance(0, "No wallet"))
             except Exception as e:
@@ -361,6 +381,10 @@ class PicoPotGUI:
     
     def display_balance(self, balance, address):
         """Update balance display with USD conversion"""
+        if not self.is_unlocked:
+            return
+        self.balance = balance
+        self.balance_address = address
         self.balance_amount.configure(text=f"{balance:.6f} SOL")
         self.address_label.configure(text=address)
         
@@ -454,6 +478,8 @@ class PicoPotGUI:
     def lock_wallet(self):
         """Lock the wallet and return to password screen"""
         self.is_unlocked = False
+        self.wallet.balance_tracker.stop()
+        threading.Thread(target=self.wallet.lock, daemon=True).start()
         self.show_password_screen()
     
     def show_send_dialog(self):
@@ -554,28 +580,40 @@ class PicoPotGUI:
             
             try:
                 amount_float = float(amount)
-                private_key = self.wallet.get_privatekey(password)
-                
-                if private_key and private_key != "wrongpass":
-                    # Show loading
-                    loading_label = ctk.CTkLabel(dialog, text="🔄 Processing transaction...", text_color="#4CC9F0")
-                    loading_label.pack(pady=5)
-                    dialog.update()
-                    
-                    result = self.wallet.send_sol(private_key, recipient, amount_float)
-                    messagebox.showinfo("Success", f"✅ Transaction sent!\n\nSignature: {result}")
-                    dialog.destroy()
-                    self.refresh_balance()
-                else:
-                    messagebox.showerror("Error", "❌ Wrong password!")
-            except Exception as e:
-                error_msg = str(e)
-                if "insufficient balance" in error_msg.lower():
+            except ValueError:
+                messagebox.showerror("Error", "❌ Invalid amount")
+                return
+            
+            # Show loading
+            loading_label = ctk.CTkLabel(dialog, text="🔄 Processing transaction...", text_color="#4CC9F0")
+            loading_label.pack(pady=5)
+            send_btn.configure(state="disabled")
+            
+            def sent(result):
+                messagebox.showinfo("Success", f"✅ Transaction sent!\n\nSignature: {result}\n\nConfirmation is tracked in the background.")
+                dialog.destroy()
+            
+            def failed(error_msg):
+                loading_label.destroy()
+                send_btn.configure(state="normal")
+                if "wrong password" in error_msg.lower():
+                    error_msg = "Wrong password!"
+                elif "insufficient balance" in error_msg.lower():
                     error_msg = "💰 Insufficient balance for transaction + fees. Try sending a slightly smaller amount or use the 'Set Max Safe Amount' button."
                 elif "adjusted amount" in error_msg.lower():
                     messagebox.showwarning("Amount Adjusted", f"⚠️ {error_msg}")
                     return
                 messagebox.showerror("Error", f"❌ {error_msg}")
+            
+            def send_thread():
+                try:
+                    # Signed on the device, the private key never leaves it
+                    result = self.wallet.send_sol(password, recipient, amount_float)
+                    self.root.after(0, lambda: sent(result))
+                except Exception as e:
+                    self.root.after(0, lambda msg=str(e): failed(msg))
+            
+            threading.Thread(target=send_thread, daemon=True).start()
         
         send_btn = ctk.CTkButton(dialog, 
                                text="🚀 Send Transaction", 
@@ -727,6 +765,8 @@ class PicoPotGUI:
                             self.root.after(0, self.show_password_screen)
                         elif result == "wrongpass":
                             self.root.after(0, lambda: messagebox.showerror("Error", "Wrong password!"))
+                        elif result == "timeout":
+                            self.root.after(0, lambda: messagebox.showerror("Error", "Device did not answer in time"))
                         else:
                             self.root.after(0, lambda: messagebox.showerror("Error", "Failed to delete wallet"))
                     except Exception as e:
@@ -0,0 +1,276 @@
+# async_pico.py
+# asyncio version of the wallet client in pico.py. Device I/O goes through
+# an asyncio serial transport (pyserial-asyncio) and RPC through
+# solana.rpc.async_api.AsyncClient, so a single event loop can talk to the
+# device, poll balances and fetch prices at the same time. Transfers are
+# built from the same SendCache as the sync client, and confirmations are
+# followed by tasks on the same loop rather than a tracker thread.
+#
+#   w = await AsyncWallet.open("COM5")
+#   info = await w.get_walletinfo()
+
+import asyncio
+import base58
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solders.transaction import Transaction
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Finalized
+import frame
+from rpc import resolve_endpoints, status_text
+from tracker import LEVELS
+from pico import (SendCache, SEND_OPTS, DeviceError, LAMPORTS_PER_SOL,
+	device_error, command_timeout, check_signature, transfer_message, plan_transfer)
+
+class AsyncWallet:
+	"""
+	Wallet client over an asyncio (reader, writer) stream pair. Replies
+	are matched to requests by id, so commands can be awaited from many
+	tasks at once; at most max_rpc RPC requests run concurrently.
+	rpc_url defaults to the first endpoint of rpc.resolve_endpoints().
+	"""
+
+	def __init__(self,reader,writer,rpc_url=None,max_rpc=4,poll_interval=1.0):
+		self.reader=reader
+		self.writer=writer
+		self.req_id=0
+		# req_id -> (Future, progress callback) for commands in flight
+		self._pending={}
+		self._read_task=None
+		self.client=AsyncClient(rpc_url or resolve_endpoints()[0],timeout=10)
+		self._rpc=asyncio.Semaphore(max_rpc)
+		self._cache=SendCache()
+		self.poll_interval=poll_interval
+		self._callbacks=[]
+		# confirmation tasks of sent transactions
+		self._confirming=set()
+		self.wallet_name=None
+
+	@classmethod
+	async def open(cls,port="COM5",baudrate=115200,**kwargs):
+		import serial_asyncio
+		reader,writer=await serial_asyncio.open_serial_connection(url=port,baudrate=baudrate)
+		self=cls(reader,writer,**kwargs)
+		await self.start()
+		return self
+
+	async def start(self):
+		self._read_task=asyncio.create_task(self._read_loop())
+		self.wallet_name=(await self.send_command(frame.GETNAME)).decode()
+
+	async def _read_loop(self):
+		parser=frame.FrameParser()
+		try:
+			while True:
+				data=await self.reader.read(4096)
+				if not data:
+					break
+				for req_id,kind,payload in parser.feed(data):
+					entry=self._pending.get(req_id)
+					if entry is None:
+						continue
+					future,progress=entry
+					if kind==frame.PROGRESS:
+						if progress:
+							progress(payload.decode())
+						continue
+					del self._pending[req_id]
+					if future.done():
+						continue
+					if kind==frame.ERROR:
+						future.set_exception(DeviceError(payload.decode()))
+					else:
+						future.set_result(payload)
+		finally:
+			self._fail_pending(DeviceError("connection lost"))
+
+	def _fail_pending(self,error):
+		pending=list(self._pending.values())
+		self._pending.clear()
+		for future,_ in pending:
+			if not future.done():
+				future.set_exception(error)
+
+	async def send_command(self,cmd,payload=b"",timeout=-1,progress=None):
+		"""Same contract as wallet.send_command"""
+		if timeout==-1:
+			timeout=command_timeout(cmd,payload)
+		self.req_id=(self.req_id+1)&0xffff
+		while self.req_id in self._pending:
+			self.req_id=(self.req_id+1)&0xffff
+		req_id=self.req_id
+		future=asyncio.get_running_loop().create_future()
+		self._pending[req_id]=(future,progress)
+		try:
+			self.writer.write(frame.encode(req_id,cmd,payload))
+			await self.writer.drain()
+			return await asyncio.wait_for(future,timeout)
+		except asyncio.TimeoutError:
+			raise DeviceError("timeout")
+		finally:
+			self._pending.pop(req_id,None)
+
+	async def close(self):
+		if self._read_task is not None:
+			self._read_task.cancel()
+		for task in list(self._confirming):
+			task.cancel()
+		self.writer.close()
+		await self.client.close()
+
+	async def get_publickey(self):
+		try:
+			return (await self.send_command(frame.GETPUBLICKEY)).hex()
+		except DeviceError as e:
+			return str(e)
+
+	async def sign_message(self,password,message: bytes) -> bytes:
+		try:
+			signature=await self.send_command(frame.SIGNTX,frame.pack_fields(str(password),message))
+		except DeviceError as e:
+			raise device_error(e)
+		check_signature(await self.get_publickey(),signature,message)
+		return signature
+
+	async def get_balance(self,address_str):
+		async with self._rpc:
+			res=await self.client.get_balance(Pubkey.from_string(address_str))
+		return res.value / LAMPORTS_PER_SOL
+
+	async def get_walletinfo(self):
+		try:
+			public_key=await self.get_publickey()
+			addr=base58.b58encode(bytes.fromhex(public_key)).decode()
+			balance=await self.get_balance(addr)
+			return {
+				"name":self.wallet_name,
+				"address":addr,
+				"public_key":public_key,
+				"balance": balance
+			}
+		except Exception:
+			return "No wallet, fail to load wallet"
+
+	async def poll_balance(self,callback,interval=30):
+		"""Calls callback(walletinfo) every interval seconds until cancelled"""
+		while True:
+			callback(await self.get_walletinfo())
+			await asyncio.sleep(interval)
+
+	def add_callback(self,callback):
+		"""
+		callback(signature, status) is called on the event loop as a sent
+		transaction moves on, status as in tracker.ConfirmationTracker
+		"""
+		self._callbacks.append(callback)
+
+	def remove_callback(self,callback):
+		if callback in self._callbacks:
+			self._callbacks.remove(callback)
+
+	async def _send_state(self, sender_pub):
+		"""
+		Balance, a recent blockhash and its lastValidBlockHeight. The
+		blockhash comes from the cache while it is fresh, otherwise it is
+		fetched concurrently with the balance.
+		"""
+		cached = self._cache.fresh_blockhash()
+		async with self._rpc:
+			try:
+				if cached is None:
+					balance_resp, bh_resp = await asyncio.gather(
+						self.client.get_balance(sender_pub, Finalized),
+						self.client.get_latest_blockhash(Finalized))
+					cached = self._cache.set_blockhash(bh_resp.value)
+				else:
+					balance_resp = await self.client.get_balance(sender_pub, Finalized)
+			except Exception as e:
+				raise Exception(f"Failed to get balance: {e}")
+		return balance_resp.value, cached[0], cached[1]
+
+	async def _fee_for(self, msg):
+		"""Fee for msg, asked once per signature count and then cached"""
+		fee = self._cache.fee(msg)
+		if fee is None:
+			try:
+				async with self._rpc:
+					fee = (await self.client.get_fee_for_message(msg)).value
+			except Exception as e:
+				print(f"Fee calculation failed, using default: {e}")
+			fee = self._cache.set_fee(msg, fee)
+		return fee
+
+	async def _submit(self, tx, last_valid):
+		"""Sends a signed transaction and starts following it, returns its signature"""
+		try:
+			async with self._rpc:
+				resp = await self.client.send_transaction(tx, opts=SEND_OPTS)
+		except Exception as e:
+			self._cache.send_failed(e)
+			raise Exception(f"RPC send_transaction error: {e}")
+		task = asyncio.create_task(self._confirm(resp.value, last_valid))
+		self._confirming.add(task)
+		task.add_done_callback(self._confirming.discard)
+		return resp.value
+
+	async def _confirm(self, signature, last_valid):
+		"""
+		Polls signature until it is finalized, fails or its blockhash
+		expires, reporting every step to the callbacks
+		"""
+		reached = -1
+		while True:
+			await asyncio.sleep(self.poll_interval)
+			try:
+				async with self._rpc:
+					statuses, height = await asyncio.gather(
+						self.client.get_signature_statuses([signature]),
+						self.client.get_block_height())
+			except Exception as e:
+				print(f"Status poll failed: {e}")
+				continue
+			status = status_text(statuses.value[0])
+			if status is None:
+				if height.value <= last_valid:
+					continue
+				steps = ["expired"]
+			elif status in LEVELS:
+				level = LEVELS.index(status)
+				steps = list(LEVELS[reached + 1:level + 1])
+				reached = max(reached, level)
+			else:
+				steps = [status]
+			for step in steps:
+				for callback in list(self._callbacks):
+					try:
+						callback(str(signature), step)
+					except Exception as e:
+						print(f"Confirmation callback failed: {e}")
+			if status not in LEVELS[:-1]:
+				return
+
+	async def send_sol(self, password: str, recipient_address: str, amount_sol: float):
+		"""Same as wallet.send_sol; confirmation is reported to add_callback()"""
+		try:
+			pk_bytes = bytes.fromhex(await self.get_publickey())
+			if len(pk_bytes) != 32:
+				raise ValueError("Public key must be 32 bytes (64 hex).")
+			sender_pub = Pubkey.from_bytes(pk_bytes)
+		except Exception as e:
+			raise Exception(f"Invalid public key from device: {e}")
+
+		recipient_pub = Pubkey.from_string(recipient_address)
+		balance, bh, last_valid = await self._send_state(sender_pub)
+		total_fee_lamports = await self._fee_for(
+			transfer_message(sender_pub, recipient_pub, int(amount_sol * LAMPORTS_PER_SOL), bh))
+		lamports = plan_transfer(balance, total_fee_lamports, amount_sol)
+		msg = transfer_message(sender_pub, recipient_pub, lamports, bh)
+
+		try:
+			signature = await self.sign_message(password, bytes(msg))
+			tx = Transaction.populate(msg, [Signature.from_bytes(signature)])
+		except Exception as e:
+			raise Exception(f"Transaction signing failed: {e}")
+
+		sig = await self._submit(tx, last_valid)
+		return f"{sig} (Fee: {total_fee_lamports / LAMPORTS_PER_SOL:.6f} SOL)"
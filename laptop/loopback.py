@@ -0,0 +1,150 @@
+# loopback.py
+# Runs the device dispatcher from pico/main.py in-process and connects it
+# to the wallet client over a pair of OS pipes, so the serial protocol can
+# be exercised without a Pico attached. The MicroPython-only modules the
+# device code imports are mapped to their CPython counterparts and the
+# wallet file lives in a temporary directory.
+#
+#   python loopback.py        runs a short create/sign/delete session
+#                             and the ping benchmark
+
+import asyncio
+import fcntl
+import os
+import sys
+import select
+import struct
+import tempfile
+import termios
+import threading
+import time
+
+PICO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pico")
+
+def _load_device():
+	import hashlib, json
+	sys.modules.setdefault("uhashlib", hashlib)
+	sys.modules.setdefault("ujson", json)
+	sys.modules.setdefault("utime", time)
+	if PICO_DIR not in sys.path:
+		sys.path.append(PICO_DIR)
+	import main as device
+	import wallet as device_wallet
+	return device, device_wallet
+
+class LoopbackSerial:
+	"""The part of serial.Serial the wallet client uses, backed by pipes"""
+
+	def __init__(self, timeout=1):
+		self.timeout = timeout
+		device, device_wallet = _load_device()
+		self._dir = tempfile.mkdtemp()
+		device_wallet.WALLET_FILE = os.path.join(self._dir, "wallet.dat")
+		device_wallet.ACCOUNTS_FILE = os.path.join(self._dir, "accounts.dat")
+		with open(device_wallet.WALLET_FILE, "w") as file:
+			file.write("None")
+		device_wallet.invalidate_record()
+
+		to_device_r, self._to_device = os.pipe()
+		self._from_device, from_device_w = os.pipe()
+		device_in = os.fdopen(to_device_r, "rb", buffering=0)
+		device_out = os.fdopen(from_device_w, "wb", buffering=0)
+
+		async def serve():
+			reader = asyncio.StreamReader()
+			loop = asyncio.get_running_loop()
+			await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), device_in)
+			await device.serve(reader, device_out.write)
+
+		def run():
+			try:
+				asyncio.run(serve())
+			finally:
+				device_out.close()
+				device_in.close()
+
+		self.thread = threading.Thread(target=run, daemon=True)
+		self.thread.start()
+
+	def write(self, data):
+		os.write(self._to_device, data)
+		return len(data)
+
+	def read(self, n=1):
+		data = b""
+		deadline = time.time() + self.timeout
+		while len(data) < n:
+			left = deadline - time.time()
+			if left <= 0 or not select.select([self._from_device], [], [], left)[0]:
+				break
+			chunk = os.read(self._from_device, n - len(data))
+			if not chunk:
+				break
+			data += chunk
+		return data
+
+	@property
+	def in_waiting(self):
+		buf = fcntl.ioctl(self._from_device, termios.FIONREAD, b"\0\0\0\0")
+		return struct.unpack("i", buf)[0]
+
+	def reset_input_buffer(self):
+		while select.select([self._from_device], [], [], 0)[0]:
+			if not os.read(self._from_device, 4096):
+				break
+
+	def close(self):
+		os.close(self._to_device)
+		self.thread.join(2)
+		os.close(self._from_device)
+
+def bench_ping(w, n=200, password=None):
+	"""Ping round-trip times in ms through a wallet client as (p50, p99, max)
+
+	With a password, an UNLOCK/LOCK pair is kept running on the device
+	for the whole run, to show how pings fare while it is busy.
+	"""
+	import frame
+	times = []
+	busy = None
+	for i in range(n):
+		if password is not None and (busy is None or busy.done()):
+			if i % 2 == 0:
+				busy = w.submit(frame.UNLOCK, password.encode())
+			else:
+				busy = w.submit(frame.LOCK)
+		start = time.perf_counter()
+		w.send_command(frame.PING)
+		times.append((time.perf_counter() - start) * 1000)
+	if busy is not None:
+		busy.result(5)
+	times.sort()
+	return times[n // 2], times[min(n - 1, n * 99 // 100)], times[-1]
+
+def bench_pipelined(w, n=200):
+	"""Pings per second with n requests in flight at once"""
+	import frame
+	start = time.perf_counter()
+	futures = [w.submit(frame.PING) for _ in range(n)]
+	for future in futures:
+		future.result(5)
+	return n / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+	from pico import wallet
+	import frame
+
+	ser = LoopbackSerial()
+	w = wallet(ser)
+	print("getname:", w.wallet_name)
+	print("createwallet:", w.create_wallet("loopback", "pw", "pw"))
+	print("getpublickey:", w.get_publickey())
+	print("unlock:", w.unlock("pw"))
+	start = time.time()
+	signature = w.sign_message("pw", b"loopback message")
+	print("signtx: %s (%.1f ms)" % (signature.hex()[:16] + "...", (time.time() - start) * 1000))
+	print("ping idle: p50 %.2f ms, p99 %.2f ms, max %.2f ms" % bench_ping(w))
+	print("ping busy: p50 %.2f ms, p99 %.2f ms, max %.2f ms" % bench_ping(w, password="pw"))
+	print("ping pipelined: %.0f/s" % bench_pipelined(w))
+	print("deletewallet:", w.delete_wallet("pw"))
+	w.close()
@@ -1,90 +1,401 @@
-import os,hashlib
-import serial,json
+import hashlib,struct
+import serial
 import base58
 import time
-import requests
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 import codecs
 from cryptography.hazmat.primitives.asymmetric import ed25519
-from solders.keypair import Keypair
 from solders.pubkey import Pubkey
+from solders.message import Message
+from solders.signature import Signature
 from solders.transaction import Transaction
 from solders.system_program import TransferParams, transfer
-from solana.rpc.api import Client
+from solders.commitment_config import CommitmentLevel
+from solders.rpc.config import RpcContextConfig
+from solders.rpc.requests import GetBalance, GetLatestBlockhash
+from solders.rpc.responses import GetBalanceResp, GetLatestBlockhashResp
 from solana.rpc.commitment import Finalized
 from solana.rpc.types import TxOpts
+import frame
+import chacha20poly1305
+from rpc import RpcPool, LAMPORTS_PER_SOL
+from tracker import ConfirmationTracker, BalanceTracker
 
+# Base fee from the fee schedule, used when getFeeForMessage fails
+LAMPORTS_PER_SIGNATURE = 5000
+# A blockhash stays usable for 150 blocks (about a minute); reuse one for
+# half of that before fetching a new one
+BLOCKHASH_TTL = 30
+# Largest serialized transaction the network accepts
+PACKET_DATA_SIZE = 1232
+# Device wallet record, as sent in the GETPRIVATEKEY reply (see
+# pico/walletfile.py)
+RECORD_HEADER = ">4sBB16sBI"
+RECORD_HEADER_SIZE = struct.calcsize(RECORD_HEADER)
+KDF_PBKDF2_SHA256 = 1
+# Seconds to wait for a device reply. Commands that check a password or
+# derive a key run PBKDF2 (calibrated to about a second) and, on a cold
+# session, build the base table and do a scalar multiplication; they also
+# queue behind each other on the device's worker thread. None of that has
+# a fixed cost on the RP2040, so they get far more room than the rest.
+COMMAND_TIMEOUT = 5
+SLOW_COMMAND_TIMEOUT = 60
+SLOW_COMMANDS = (frame.UNLOCK, frame.LOCK, frame.SIGNTX, frame.SIGNWITH,
+	frame.GETPRIVATEKEY, frame.DELETEWALLET, frame.LISTACCOUNTS)
+
+class DeviceError(Exception):
+	"""Error reply from the device, str() is its reason e.g. "wrongpass" """
+
+def device_error(e):
+	"""Exception with a readable message for a SIGNTX error reply"""
+	if str(e)=="wrongpass":
+		return Exception("Wrong password")
+	elif str(e)=="nowallet":
+		return Exception("No wallet on device")
+	elif str(e)=="timeout":
+		return Exception("Device did not answer in time")
+	elif str(e)=="badwallet":
+		return Exception("Wallet file on device is unreadable, delete or recreate the wallet")
+	return e
+
+def command_timeout(cmd,payload=b""):
+	"""Default reply timeout for cmd, see SLOW_COMMANDS"""
+	# GETPUBLICKEY for an account may derive it
+	if cmd in SLOW_COMMANDS or (cmd==frame.GETPUBLICKEY and payload):
+		return SLOW_COMMAND_TIMEOUT
+	return COMMAND_TIMEOUT
+
+def check_signature(public_key_hex,signature,message):
+	"""Raises if signature is not the wallet's signature of message"""
+	try:
+		public_key=bytes.fromhex(public_key_hex)
+		ed25519.Ed25519PublicKey.from_public_bytes(public_key).verify(signature,message)
+	except Exception as e:
+		raise Exception(f"Device returned an invalid signature: {e}")
+
+def transfer_message(sender_pub,recipient_pub,lamports,blockhash):
+	return transfers_message(sender_pub,[(recipient_pub,lamports)],blockhash)
+
+def transfers_message(sender_pub,transfers,blockhash):
+	"""One message paying every (recipient Pubkey, lamports) in transfers"""
+	ixs = [
+		transfer(
+			TransferParams(
+				from_pubkey=sender_pub,
+				to_pubkey=recipient_pub,
+				lamports=lamports,
+			)
+		)
+		for recipient_pub, lamports in transfers
+	]
+	return Message.new_with_blockhash(ixs, sender_pub, blockhash)
+
+def pack_transfers(sender_pub,transfers,blockhash):
+	"""
+	Splits transfers into as few messages as possible, each small enough
+	to go out as a single-signature transaction. Returns a list of
+	(message, transfers in it).
+	"""
+	packed = []
+	group = []
+	for item in transfers:
+		group.append(item)
+		# compact-u16 signature count plus one signature
+		if len(group) > 1 and 1 + 64 + len(bytes(transfers_message(sender_pub, group, blockhash))) > PACKET_DATA_SIZE:
+			group.pop()
+			packed.append((transfers_message(sender_pub, group, blockhash), group))
+			group = [item]
+	if group:
+		packed.append((transfers_message(sender_pub, group, blockhash), group))
+	return packed
+
+def open_record(data, password):
+	"""The seed in a device wallet record as hex, None if it does not open"""
+	magic, version, name_len, salt, kdf, iterations = struct.unpack_from(RECORD_HEADER, data)
+	password = str(password).encode('utf-8')
+	if kdf == KDF_PBKDF2_SHA256:
+		key = hashlib.pbkdf2_hmac("sha256", password, salt, iterations)
+	else:
+		key = hashlib.sha256(password).digest()
+	pos = RECORD_HEADER_SIZE + name_len
+	if version == 1:
+		# Seed XORed with the key; the device has already checked its MAC
+		seed = int.from_bytes(data[pos:pos + 32], "big") ^ int.from_bytes(key, "big")
+		return seed.to_bytes(32, "big").hex()
+	# nonce | public key | sealed seed | tag, the seed's prefix is the AAD
+	seed = bytearray(data[-48:-16])
+	if not chacha20poly1305.decrypt(key, data[pos:pos + 12], seed, data[-16:], data[:-48]):
+		return None
+	return seed.hex()
+
+def plan_transfer(balance_lamports,fee_lamports,amount_sol):
+	"""
+	Lamports to send for amount_sol given the balance and fee estimate.
+	Lowers the amount to what the balance can cover after fees, raises
+	if even that is not possible.
+	"""
+	balance_sol = balance_lamports / LAMPORTS_PER_SOL
+	fee_sol = fee_lamports / LAMPORTS_PER_SOL
+
+	# Calculate maximum possible amount (leave room for actual fees)
+	max_possible_amount = balance_sol - fee_sol
+	
+	# If trying to send more than possible, adjust automatically
+	if amount_sol > max_possible_amount:
+		if max_possible_amount <= 0:
+			raise Exception(f"Insufficient balance for fees. Need at least {fee_sol:.6f} SOL for transaction fees.")
+		
+		# Auto-adjust to maximum possible amount
+		adjusted_amount = max_possible_amount
+		print(f"⚠️  Adjusted amount from {amount_sol} SOL to {adjusted_amount:.6f} SOL to cover {fee_sol:.6f} SOL in fees")
+		amount_sol = adjusted_amount
+
+	lamports = int(amount_sol * LAMPORTS_PER_SOL)
+
+	# Final validation
+	if balance_lamports < lamports + fee_lamports:
+		raise Exception(f"Insufficient balance. Have {balance_sol:.6f} SOL, need {amount_sol:.6f} SOL + {fee_sol:.6f} SOL fees = {amount_sol + fee_sol:.6f} SOL total.")
+	return lamports
+
+# Options every send uses: preflight against finalized state, then return
+# as soon as the node has the transaction
+SEND_OPTS = TxOpts(
+	skip_preflight=False,
+	preflight_commitment=Finalized,
+	skip_confirmation=True,
+	max_retries=10,
+)
+
+class SendCache:
+	"""
+	The blockhash and fee caches a transfer is built from. It does no
+	I/O: wallet fills it from RpcPool batches, async_pico.AsyncWallet
+	from AsyncClient coroutines.
+	"""
 
-class wallet:
 	def __init__(self):
-		connected=False
-		print("connect your device")
-		while connected==False:
-			try:
-				self.ser = serial.Serial("COM5", 115200, timeout=1)
-				connected=True
-			except:
-				pass
-
-		print("Connected Waiting to boot...")		
-		time.sleep(3)
-		self.wallet_name=str(self.send_command("getname"))
+		# (blockhash, lastValidBlockHeight, time.monotonic() when fetched)
+		self.blockhash=None
+		# num_required_signatures -> fee in lamports
+		self.fees={}
+
+	def fresh_blockhash(self):
+		"""(blockhash, lastValidBlockHeight) while the cached one is fresh, else None"""
+		cached=self.blockhash
+		if cached is None or time.monotonic()-cached[2]>=BLOCKHASH_TTL:
+			return None
+		return cached[0],cached[1]
+
+	def set_blockhash(self,value):
+		"""Caches a getLatestBlockhash value, returns (blockhash, lastValidBlockHeight)"""
+		self.blockhash=(value.blockhash,value.last_valid_block_height,time.monotonic())
+		return value.blockhash,value.last_valid_block_height
+
+	def fee(self,msg):
+		"""Cached fee for msg's signature count, None if not asked yet"""
+		return self.fees.get(msg.header.num_required_signatures)
+
+	def set_fee(self,msg,fee):
+		"""
+		Caches the getFeeForMessage answer for msg and returns the fee;
+		None (no answer) gives the base fee and is not cached
+		"""
+		signatures=msg.header.num_required_signatures
+		if fee is None:
+			return LAMPORTS_PER_SIGNATURE*signatures
+		self.fees[signatures]=fee
+		return fee
+
+	def send_failed(self,error):
+		"""
+		Drops the blockhash if error says the node no longer accepts it,
+		returns True if it did
+		"""
+		if "blockhash" in str(error).lower():
+			self.blockhash=None
+			return True
+		return False
+
+class wallet:
+	def __init__(self,ser=None,endpoints=None):
+		self.req_id=0
+		self.rpc=RpcPool(endpoints)
+		# Follows sent transactions; add_callback() to hear about them
+		self.tracker=ConfirmationTracker(self.rpc)
+		# Pushes balance changes of an address; see BalanceTracker.watch()
+		self.balance_tracker=BalanceTracker(self.rpc)
+		self._cache=SendCache()
+		# req_id -> (Future, progress callback) for commands in flight
+		self._pending={}
+		self._lock=threading.Lock()
+		self._closed=False
+		if ser is not None:
+			self.ser=ser
+		else:
+			connected=False
+			print("connect your device")
+			while connected==False:
+				try:
+					self.ser = serial.Serial("COM5", 115200, timeout=1)
+					connected=True
+				except:
+					pass
+
+			print("Connected Waiting to boot...")		
+			time.sleep(3)
+		self.ser.reset_input_buffer()
+		self._reader=threading.Thread(target=self._read_loop,daemon=True)
+		self._reader.start()
+		self.wallet_name=self.send_command(frame.GETNAME).decode()
 		if self.wallet_name is None or self.wallet_name == "None":
 			pass
 	
-	def hash(self,text):
-		hash_object = hashlib.sha256(str(text).encode('utf-8'))
-		hex_digest = hash_object.digest()
-		hex_digest_str = "".join("{:02x}".format(b) for b in hex_digest)
-		return hex_digest_str
-	
-	def send_command(self,cmd):
-		self.ser.reset_input_buffer()
-		self.ser.write((cmd + "\n").encode())
-		response = self.ser.readline().decode().strip()
-		return response
+	def _read_loop(self):
+		"""Reader thread: hands every reply to the Future of its request id"""
+		parser=frame.FrameParser()
+		while not self._closed:
+			try:
+				data=self.ser.read(max(1,self.ser.in_waiting))
+			except Exception as e:
+				self._fail_pending(DeviceError(f"connection lost: {e}"))
+				return
+			for req_id,kind,payload in parser.feed(data):
+				with self._lock:
+					entry=self._pending.get(req_id)
+					if entry is not None and kind!=frame.PROGRESS:
+						del self._pending[req_id]
+				if entry is None:
+					continue
+				future,progress=entry
+				if kind==frame.PROGRESS:
+					if progress:
+						progress(payload.decode())
+				elif kind==frame.ERROR:
+					future.set_exception(DeviceError(payload.decode()))
+				else:
+					future.set_result(payload)
+
+	def _fail_pending(self,error):
+		with self._lock:
+			pending=list(self._pending.values())
+			self._pending.clear()
+		for future,_ in pending:
+			future.set_exception(error)
+
+	def submit(self,cmd,payload=b"",progress=None):
+		"""
+		Sends one framed command without waiting. Returns a Future for the
+		reply payload; an error reply sets DeviceError on it. progress(text)
+		is called from the reader thread for PROGRESS frames.
+		"""
+		future=Future()
+		with self._lock:
+			if self._closed:
+				raise DeviceError("closed")
+			self.req_id=(self.req_id+1)&0xffff
+			while self.req_id in self._pending:
+				self.req_id=(self.req_id+1)&0xffff
+			self._pending[self.req_id]=(future,progress)
+			try:
+				self.ser.write(frame.encode(self.req_id,cmd,payload))
+			except Exception as e:
+				del self._pending[self.req_id]
+				raise DeviceError(f"write failed: {e}")
+		return future
+
+	def send_command(self,cmd,payload=b"",timeout=-1,progress=None):
+		"""
+		Sends one framed command and waits for its reply. Returns the
+		reply payload, raises DeviceError for an error reply or a timeout.
+		timeout is in seconds, None waits for ever and the default is
+		command_timeout(cmd). Safe to call from several threads at once.
+		"""
+		if timeout==-1:
+			timeout=command_timeout(cmd,payload)
+		future=self.submit(cmd,payload,progress)
+		try:
+			return future.result(timeout)
+		except FutureTimeout:
+			with self._lock:
+				for req_id,entry in list(self._pending.items()):
+					if entry[0] is future:
+						del self._pending[req_id]
+			raise DeviceError("timeout")
+
+	def close(self):
+		self._closed=True
+		self.ser.close()
+		self.tracker.close()
+		self.balance_tracker.close()
+		self.rpc.close()
+		self._fail_pending(DeviceError("closed"))
 
-	def create_wallet(self,name,password,password2):
+	def create_wallet(self,name,password,password2,progress=None):
 		if password!=password2:
 			return "password_mismatch"
 		else:
-			command=f"createwallet:{str(name)}:{str(password)}:{str(password2)}"
-			self.ser.write((command + "\n").encode())
-			
 			print("⏳ Key generation started - waiting...")
-			
-			# ✅ SIMPLE - JUST LISTEN FOR ANY RESPONSE
-			while True:
-				response = self.ser.readline().decode().strip()
-				if response:
-					print(f"Pico: {response}")
-					
-				if response == "created":
-					return "created"
-				elif response == "walletexist":
-					return "walletexist"
-				elif response == "different password please try again":
-					return "password_mismatch"
+			if progress is None:
+				progress=lambda text: print(f"Pico: {text}")
+			try:
+				self.send_command(frame.CREATEWALLET,
+					frame.pack_fields(str(name),str(password),str(password2)),
+					timeout=None,progress=progress)
+				return "created"
+			except DeviceError as e:
+				return str(e)
 
 	def delete_wallet(self,password):
-		command=f"deletewallet:{str(password)}"
-		return self.send_command(command)
+		try:
+			return self.send_command(frame.DELETEWALLET,str(password).encode()).decode()
+		except DeviceError as e:
+			return str(e)
 
 	def get_privatekey(self,password):
-		command=f"getprivatekey:{str(password)}"
-		recieve=self.send_command(command)
-		if recieve=="wrongpass":
-			return "wrongpass"
-		else:
-			return self.xor_decrypt(recieve,self.hash(password))
+		try:
+			recieve=self.send_command(frame.GETPRIVATEKEY,str(password).encode())
+		except DeviceError as e:
+			return str(e)
+		private_key=open_record(recieve,password)
+		if private_key is None:
+			return "badrecord"
+		return private_key
 	
-	def hex_bytes(self,hex):
-		return bytes.fromhex(hex)
+	def unlock(self,password):
+		try:
+			return self.send_command(frame.UNLOCK,str(password).encode()).decode()
+		except DeviceError as e:
+			return str(e)
 
-	def xor_decrypt(self,msg,k):
-		key=self.hex_bytes(k)
-		message=self.hex_bytes(msg)
-		result = bytes([message[i]^key[i%len(key)] for i in range(len(message))])
-		return result.hex()
+	def lock(self):
+		try:
+			return self.send_command(frame.LOCK).decode()
+		except DeviceError as e:
+			return str(e)
+
+	def sign_message(self,password,message: bytes) -> bytes:
+		"""
+		Signs a serialized Solana message on the device and checks the
+		returned signature against the wallet's public key.
+		"""
+		try:
+			signature=self.send_command(frame.SIGNTX,frame.pack_fields(str(password),message))
+		except DeviceError as e:
+			raise device_error(e)
+		check_signature(self.get_publickey(),signature,message)
+		return signature
+
+	def sign_with_account(self,password,account,message: bytes) -> bytes:
+		"""sign_message for HD account n instead of the wallet's own key"""
+		try:
+			signature=self.send_command(frame.SIGNWITH,frame.pack_fields(str(password),struct.pack(">I",account),message))
+		except DeviceError as e:
+			if str(e)=="badaccount":
+				raise Exception(f"No account {account} on device")
+			raise device_error(e)
+		check_signature(self.get_account_publickey(account),signature,message)
+		return signature
 
 	def get_address(self,hex_public_key_str: str) -> str:
 		"""
@@ -107,9 +418,8 @@ class wallet:
 		return solana_address
 
 	def get_balance(self, address_str):
-		client = Client("https://api.devnet.solana.com")  
 		pubkey = Pubkey.from_string(address_str)
-		res = client.get_balance(pubkey) 
+		res = self.rpc.get_balance(pubkey)
 		lamports = res.value
 		return lamports / 1_000_000_000
 
@@ -129,123 +439,243 @@ class wallet:
 			return "No wallet, fail to load wallet"
 
 	def get_publickey(self):
-		return self.send_command("getpublickey")
-	
-	def send_sol(self, private_key_hex: str, recipient_address: str, amount_sol: float):
-		client = Client("https://api.devnet.solana.com")
-		LAMPORTS_PER_SOL = 1_000_000_000
-		
 		try:
-			sk_bytes = bytes.fromhex(private_key_hex)
-			if len(sk_bytes) != 32:
-				raise ValueError("Private key must be 32 bytes (64 hex).")
-			sender = Keypair.from_seed(sk_bytes)
-		except Exception as e:
-			raise Exception(f"Invalid private key: {e}")
+			return self.send_command(frame.GETPUBLICKEY).hex()
+		except DeviceError as e:
+			return str(e)
 
-		sender_pub = sender.pubkey()
-		recipient_pub = Pubkey.from_string(recipient_address)
-		
-		# Get sender's current balance
+	def get_account_publickey(self,account):
+		"""
+		Public key of HD account n as hex. Accounts already in the
+		device's index answer while locked, once the wallet has been
+		unlocked since boot; a new one needs the wallet unlocked so the
+		device can derive it.
+		"""
 		try:
-			balance_resp = client.get_balance(sender_pub)
-			current_balance_lamports = balance_resp.value
-			current_balance_sol = current_balance_lamports / LAMPORTS_PER_SOL
-		except Exception as e:
-			raise Exception(f"Failed to get balance: {e}")
+			return self.send_command(frame.GETPUBLICKEY,struct.pack(">I",account)).hex()
+		except DeviceError as e:
+			return str(e)
 
-		# --- Calculate actual transaction fee ---
+	def list_accounts(self):
+		"""
+		[(account, public key hex)] for every account derived so far.
+		Raises DeviceError("locked") until the wallet has been unlocked
+		once since the device booted, as the index cannot be checked
+		before that.
+		"""
+		accounts=[]
+		start=0
+		while True:
+			data=self.send_command(frame.LISTACCOUNTS,struct.pack(">I",start))
+			if not data:
+				return accounts
+			for pos in range(0,len(data),36):
+				account,public_key=struct.unpack(">I32s",data[pos:pos+36])
+				accounts.append((account,public_key.hex()))
+			start=accounts[-1][0]+1
+	
+	def _send_state(self, sender_pub):
+		"""
+		Balance, a recent blockhash and its lastValidBlockHeight in one
+		round trip. The blockhash
+		comes from the cache while it is fresh, otherwise it is fetched in
+		the same JSON-RPC batch as the balance.
+		"""
+		config = RpcContextConfig(commitment=CommitmentLevel.Finalized)
+		requests = [GetBalance(sender_pub, config, 0)]
+		parsers = [GetBalanceResp]
+		cached = self._cache.fresh_blockhash()
+		if cached is None:
+			requests.append(GetLatestBlockhash(config, 1))
+			parsers.append(GetLatestBlockhashResp)
 		try:
-			# First, build the transaction to calculate fee
-			bh = client.get_latest_blockhash().value.blockhash
-			ix = transfer(
-				TransferParams(
-					from_pubkey=sender_pub,
-					to_pubkey=recipient_pub,
-					lamports=10000,  # Dummy amount for fee calculation
-				)
-			)
-			tx = Transaction.new_signed_with_payer(
-				instructions=[ix],
-				payer=sender_pub,
-				signing_keypairs=[sender],
-				recent_blockhash=bh,
-			)
-			
-			# Get fee for the transaction
-			fee_response = client.get_fee_for_message(tx.message)
-			if fee_response.value is None:
-				raise Exception("Could not calculate transaction fee")
-			
-			actual_fee_lamports = fee_response.value
-			actual_fee_sol = actual_fee_lamports / LAMPORTS_PER_SOL
-			
-			# Add small buffer for safety (10%)
-			fee_buffer = actual_fee_lamports * 0.1
-			total_fee_lamports = actual_fee_lamports + fee_buffer
-			total_fee_sol = total_fee_lamports / LAMPORTS_PER_SOL
-			
+			responses = self.rpc.batch(requests, parsers)
 		except Exception as e:
-			print(f"Fee calculation failed, using default: {e}")
-			# Fallback to safe estimate
-			total_fee_lamports = 10000  # 0.00001 SOL as fallback
-			total_fee_sol = 0.00001
+			raise Exception(f"Failed to get balance: {e}")
+		for resp, parser in zip(responses, parsers):
+			if not isinstance(resp, parser):
+				raise Exception(f"Failed to get balance: {resp}")
+		if cached is None:
+			cached = self._cache.set_blockhash(responses[1].value)
+		return responses[0].value, cached[0], cached[1]
 
-		# Calculate maximum possible amount (leave room for actual fees)
-		max_possible_amount = current_balance_sol - total_fee_sol
-		
-		# If trying to send more than possible, adjust automatically
-		if amount_sol > max_possible_amount:
-			if max_possible_amount <= 0:
-				raise Exception(f"Insufficient balance for fees. Need at least {total_fee_sol:.6f} SOL for transaction fees.")
-			
-			# Auto-adjust to maximum possible amount
-			adjusted_amount = max_possible_amount
-			print(f"⚠️  Adjusted amount from {amount_sol} SOL to {adjusted_amount:.6f} SOL to cover {total_fee_sol:.6f} SOL in fees")
-			amount_sol = adjusted_amount
+	def _fee_for(self, msg):
+		"""Fee for msg, asked once per signature count and then cached"""
+		fee = self._cache.fee(msg)
+		if fee is None:
+			try:
+				fee = self.rpc.get_fee_for_message(msg).value
+			except Exception as e:
+				print(f"Fee calculation failed, using default: {e}")
+			fee = self._cache.set_fee(msg, fee)
+		return fee
+
+	def _prepare_transfer(self, sender_pub, recipient_pub, amount_sol):
+		"""(message, fee in lamports, lastValidBlockHeight) for paying amount_sol"""
+		current_balance_lamports, bh, last_valid = self._send_state(sender_pub)
 
-		lamports = int(amount_sol * LAMPORTS_PER_SOL)
+		# The fee does not depend on the amount, so quote it on the real
+		# message shape before the amount is final
+		total_fee_lamports = self._fee_for(
+			transfer_message(sender_pub, recipient_pub, int(amount_sol * LAMPORTS_PER_SOL), bh))
 
-		# Final validation
-		if current_balance_lamports < lamports + total_fee_lamports:
-			raise Exception(f"Insufficient balance. Have {current_balance_sol:.6f} SOL, need {amount_sol:.6f} SOL + {total_fee_sol:.6f} SOL fees = {amount_sol + total_fee_sol:.6f} SOL total.")
+		lamports = plan_transfer(current_balance_lamports, total_fee_lamports, amount_sol)
+		return transfer_message(sender_pub, recipient_pub, lamports, bh), total_fee_lamports, last_valid
 
-		# --- Now build the actual transaction ---
+	def _submit(self, tx, last_valid):
+		"""Sends a signed transaction and hands it to the tracker, returns its signature"""
 		try:
-			bh = client.get_latest_blockhash().value.blockhash
+			resp = self.rpc.send_transaction(tx, SEND_OPTS)
+			self.tracker.track(resp.value, last_valid)
+			return resp.value
 		except Exception as e:
-			raise Exception(f"Failed to fetch blockhash: {e}")
+			self._cache.send_failed(e)
+			raise Exception(f"RPC send_transaction error: {e}")
 
-		# --- Create actual instruction ---
-		ix = transfer(
-			TransferParams(
-				from_pubkey=sender_pub,
-				to_pubkey=recipient_pub,
-				lamports=lamports,
-			)
-		)
+	def send_sol(self, password: str, recipient_address: str, amount_sol: float):
+		"""
+		Sends amount_sol and returns as soon as the node accepts the
+		transaction. Confirmation is followed by self.tracker.
+		"""
+		try:
+			pk_bytes = bytes.fromhex(self.get_publickey())
+			if len(pk_bytes) != 32:
+				raise ValueError("Public key must be 32 bytes (64 hex).")
+			sender_pub = Pubkey.from_bytes(pk_bytes)
+		except Exception as e:
+			raise Exception(f"Invalid public key from device: {e}")
 
-		# --- Build + sign tx ---
+		recipient_pub = Pubkey.from_string(recipient_address)
+		msg, total_fee_lamports, last_valid = self._prepare_transfer(sender_pub, recipient_pub, amount_sol)
+
+		# --- Sign on the device ---
 		try:
-			tx = Transaction.new_signed_with_payer(
-				instructions=[ix],
-				payer=sender_pub,
-				signing_keypairs=[sender],
-				recent_blockhash=bh,
-			)
+			signature = self.sign_message(password, bytes(msg))
+			tx = Transaction.populate(msg, [Signature.from_bytes(signature)])
 		except Exception as e:
 			raise Exception(f"Transaction signing failed: {e}")
 
 		# --- Send transaction ---
+		sig = self._submit(tx, last_valid)
+		return f"{sig} (Fee: {total_fee_lamports / LAMPORTS_PER_SOL:.6f} SOL)"  # Return signature + fee info
+
+	def send_batch(self, password: str, recipients, max_parallel=8, timeout=90):
+		"""
+		Pays every (address, amount_sol) in recipients. Transfers are packed
+		into as few transactions as fit the size limit, each is signed once
+		on the device, up to max_parallel are submitted at a time, and all
+		of them are confirmed together.
+
+		Transactions the node turns away for their blockhash are rebuilt on
+		a fresh one, signed again and resent once.
+
+		Returns one dict per transaction with its signature, the
+		(address, lamports) it pays and a status: "finalized", "failed: ...",
+		"send failed: ...", "expired" or "pending" if timeout ran out.
+		"""
+		public_key = self.get_publickey()
 		try:
-			opts = TxOpts(
-				skip_preflight=False,
-				preflight_commitment=Finalized,
-				skip_confirmation=False,
-				max_retries=10,
-			)
-			resp = client.send_transaction(tx, opts=opts)
-			return f"{resp.value} (Fee: {total_fee_sol:.6f} SOL)"  # Return signature + fee info
+			sender_pub = Pubkey.from_bytes(bytes.fromhex(public_key))
 		except Exception as e:
-			raise Exception(f"RPC send_transaction error: {e}")
-		
\ No newline at end of file
+			raise Exception(f"Invalid public key from device: {e}")
+		transfers = [(Pubkey.from_string(address), int(amount_sol * LAMPORTS_PER_SOL))
+			for address, amount_sol in recipients]
+		if not transfers:
+			return []
+
+		balance, bh, last_valid = self._send_state(sender_pub)
+		packed = pack_transfers(sender_pub, transfers, bh)
+		fee = self._fee_for(packed[0][0]) * len(packed)
+		total = sum(lamports for _, lamports in transfers) + fee
+		if balance < total:
+			raise Exception(f"Insufficient balance. Have {balance / LAMPORTS_PER_SOL:.6f} SOL, need {total / LAMPORTS_PER_SOL:.6f} SOL including {fee / LAMPORTS_PER_SOL:.6f} SOL fees.")
+
+		txs = self._sign_all(password, public_key, [msg for msg, _ in packed])
+		results = [{
+			"signature": str(tx.signatures[0]),
+			"recipients": [(str(pub), lamports) for pub, lamports in group],
+			"status": None,
+		} for tx, (_, group) in zip(txs, packed)]
+		stale = self._send_all(txs, results, range(len(txs)), max_parallel)
+
+		if stale:
+			# The cache has dropped the blockhash; the same transfers fit
+			# the same messages on a new one
+			_, bh, last_valid = self._send_state(sender_pub)
+			retry = self._sign_all(password, public_key,
+				[transfers_message(sender_pub, packed[i][1], bh) for i in stale])
+			for i, tx in zip(stale, retry):
+				txs[i] = tx
+				results[i]["signature"] = str(tx.signatures[0])
+				results[i]["status"] = None
+			self._send_all(txs, results, stale, max_parallel)
+		self._confirm_all(results, last_valid, timeout)
+		return results
+
+	def _sign_all(self, password, public_key, messages):
+		"""Signed Transactions for messages, all queued on the device at once"""
+		# The device works through them back to back
+		futures = [self.submit(frame.SIGNTX, frame.pack_fields(str(password), bytes(msg)))
+			for msg in messages]
+		txs = []
+		for msg, future in zip(messages, futures):
+			try:
+				signature = future.result(SLOW_COMMAND_TIMEOUT)
+			except DeviceError as e:
+				raise device_error(e)
+			except FutureTimeout:
+				raise DeviceError("timeout")
+			check_signature(public_key, signature, bytes(msg))
+			txs.append(Transaction.populate(msg, [Signature.from_bytes(signature)]))
+		return txs
+
+	def _send_all(self, txs, results, indices, max_parallel):
+		"""
+		Sends txs[i] for every i in indices, max_parallel at a time. A
+		failure goes into results[i]["status"]. Returns the indices that
+		failed on their blockhash.
+		"""
+		stale = []
+
+		def send(i):
+			try:
+				self.rpc.send_transaction(txs[i], SEND_OPTS)
+			except Exception as e:
+				results[i]["status"] = f"send failed: {e}"
+				if self._cache.send_failed(e):
+					stale.append(i)
+
+		with ThreadPoolExecutor(max_parallel) as pool:
+			list(pool.map(send, indices))
+		return sorted(stale)
+
+	def _confirm_all(self, results, last_valid, timeout, interval=0.5):
+		"""
+		Follows every pending signature in results to finalization. Each
+		round is a single RpcPool.signature_statuses() batch, whose block
+		height tells when the blockhash has expired.
+		"""
+		deadline = time.monotonic() + timeout
+		pending = [r for r in results if r["status"] is None]
+		while pending:
+			try:
+				statuses, height = self.rpc.signature_statuses([r["signature"] for r in pending])
+			except Exception as e:
+				print(f"Status poll failed: {e}")
+			else:
+				for result, status in zip(pending, statuses):
+					if status is None:
+						# Landed transactions are followed to the end; ones
+						# the cluster never saw are dead once the blockhash
+						# expires
+						if height > last_valid:
+							result["status"] = "expired"
+					elif status == "finalized" or status.startswith("failed"):
+						result["status"] = status
+				pending = [r for r in pending if r["status"] is None]
+			if pending and time.monotonic() > deadline:
+				for result in pending:
+					result["status"] = "pending"
+				return
+			if pending:
+				time.sleep(interval)
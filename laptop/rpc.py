@@ -0,0 +1,179 @@
+# rpc.py
+# Long-lived Solana RPC sessions for the wallet client. RpcPool holds one
+# httpx session with HTTP keep-alive per endpoint for the life of the
+# wallet, which saves a TCP and TLS handshake on every balance refresh and
+# send. Requests and responses are solders objects, sent as JSON-RPC
+# through their public to_json/from_json (and batch_to_json/
+# batch_from_json for batches). The pool also keeps an ordered endpoint
+# list with failover: an endpoint whose transport fails is skipped for a
+# while and the next one is used.
+#
+# Endpoints can be given as names from ENDPOINTS or as URLs, or through
+# the PICOPOT_RPC environment variable, e.g. PICOPOT_RPC=local,devnet
+
+import os
+import threading
+import time
+import httpx
+from solders.commitment_config import CommitmentLevel
+from solders.rpc.config import RpcContextConfig, RpcSendTransactionConfig, RpcSignatureStatusConfig
+from solders.rpc.requests import (GetBalance, GetFeeForMessage, GetSignatureStatuses,
+	GetBlockHeight, SendLegacyTransaction, batch_to_json)
+from solders.rpc.responses import (GetBalanceResp, GetFeeForMessageResp, GetSignatureStatusesResp,
+	GetBlockHeightResp, SendTransactionResp, batch_from_json)
+from solders.signature import Signature
+from solders.transaction_status import TransactionConfirmationStatus
+
+ENDPOINTS = {
+	"devnet": "https://api.devnet.solana.com",
+	"mainnet": "https://api.mainnet-beta.solana.com",
+	"local": "http://127.0.0.1:8899",
+}
+
+LAMPORTS_PER_SOL = 1_000_000_000
+
+# Most signatures one getSignatureStatuses call may ask about
+MAX_STATUS_QUERY = 256
+
+# solders enums are not hashable, so these are looked up by equality
+_LEVELS = (
+	(TransactionConfirmationStatus.Processed, "processed"),
+	(TransactionConfirmationStatus.Confirmed, "confirmed"),
+	(TransactionConfirmationStatus.Finalized, "finalized"),
+)
+
+class RpcError(Exception):
+	"""An error response from a node; str() is the node's message"""
+
+def status_text(status):
+	"""
+	"processed", "confirmed", "finalized" or "failed: <err>" for a
+	signature status, None if the cluster has not seen the signature
+	"""
+	if status is None:
+		return None
+	if status.err is not None:
+		return f"failed: {status.err}"
+	for level, text in _LEVELS:
+		if status.confirmation_status == level:
+			return text
+	# Nodes leave confirmation_status out for rooted transactions
+	return "finalized"
+
+def resolve_endpoints(endpoints=None):
+	"""List of URLs from names/URLs, a comma separated string, or PICOPOT_RPC"""
+	if endpoints is None:
+		endpoints = os.environ.get("PICOPOT_RPC", "devnet")
+	if isinstance(endpoints, str):
+		endpoints = [e.strip() for e in endpoints.split(",") if e.strip()]
+	return [ENDPOINTS.get(e, e) for e in endpoints]
+
+class RpcPool:
+	"""
+	One persistent HTTP session per endpoint. Every request goes to the
+	first healthy endpoint and fails over on transport errors; RPC level
+	errors (a rejected transaction, say) are raised as they are.
+	"""
+
+	def __init__(self, endpoints=None, timeout=10, cooldown=30):
+		self.urls = resolve_endpoints(endpoints)
+		if not self.urls:
+			raise ValueError("no RPC endpoints")
+		self.timeout = timeout
+		self.cooldown = cooldown
+		self._sessions = {}
+		self._down_until = {}
+		self._lock = threading.Lock()
+
+	def session(self, url):
+		"""The persistent httpx session for url"""
+		with self._lock:
+			session = self._sessions.get(url)
+			if session is None:
+				session = self._sessions[url] = httpx.Client(timeout=self.timeout)
+			return session
+
+	def _order(self):
+		# Healthy endpoints in configured order, then the ones cooling down
+		now = time.monotonic()
+		up = [u for u in self.urls if self._down_until.get(u, 0) <= now]
+		down = [u for u in self.urls if u not in up]
+		return up + down
+
+	def request(self, request, parser):
+		"""
+		Sends one solders request object and returns the response parsed
+		with parser. An error response raises RpcError.
+		"""
+		resp = parser.from_json(self._run(request.to_json()))
+		if not isinstance(resp, parser):
+			raise RpcError(str(resp))
+		return resp
+
+	def batch(self, requests, parsers):
+		"""
+		Sends solders request objects as one JSON-RPC batch, returns the
+		parsed responses in order. An entry the node answered with an
+		error is that error object; callers check the types.
+		"""
+		return batch_from_json(self._run(batch_to_json(list(requests))), list(parsers))
+
+	def get_balance(self, pubkey, commitment=None):
+		config = None if commitment is None else RpcContextConfig(commitment=commitment)
+		return self.request(GetBalance(pubkey, config), GetBalanceResp)
+
+	def get_fee_for_message(self, msg):
+		return self.request(GetFeeForMessage(msg), GetFeeForMessageResp)
+
+	def send_transaction(self, tx, opts):
+		"""Sends a signed Transaction under solana TxOpts, returns SendTransactionResp"""
+		commitment = opts.preflight_commitment
+		config = RpcSendTransactionConfig(
+			skip_preflight=opts.skip_preflight,
+			preflight_commitment=None if commitment is None else CommitmentLevel.from_string(commitment),
+			max_retries=opts.max_retries,
+		)
+		return self.request(SendLegacyTransaction(tx, config), SendTransactionResp)
+
+	def signature_statuses(self, signatures):
+		"""
+		Statuses of any number of signatures and the current block height,
+		in one JSON-RPC batch. Returns (list of status_text() values,
+		block height).
+		"""
+		config = RpcSignatureStatusConfig(False)
+		signatures = [s if isinstance(s, Signature) else Signature.from_string(s) for s in signatures]
+		chunks = [signatures[i:i + MAX_STATUS_QUERY] for i in range(0, len(signatures), MAX_STATUS_QUERY)]
+		requests = [GetSignatureStatuses(chunk, config, i) for i, chunk in enumerate(chunks)]
+		requests.append(GetBlockHeight(None, len(chunks)))
+		parsers = [GetSignatureStatusesResp] * len(chunks) + [GetBlockHeightResp]
+		responses = self.batch(requests, parsers)
+		for resp, parser in zip(responses, parsers):
+			if not isinstance(resp, parser):
+				raise Exception(f"Status query failed: {resp}")
+		statuses = []
+		for resp in responses[:-1]:
+			statuses.extend(status_text(status) for status in resp.value)
+		return statuses, responses[-1].value
+
+	def _run(self, body):
+		# POSTs a JSON-RPC body, returns the reply text
+		errors = []
+		for url in self._order():
+			try:
+				resp = self.session(url).post(url, content=body,
+					headers={"Content-Type": "application/json"})
+				resp.raise_for_status()
+			except httpx.HTTPError as e:
+				self._down_until[url] = time.monotonic() + self.cooldown
+				errors.append(f"{url}: {e}")
+				continue
+			self._down_until.pop(url, None)
+			return resp.text
+		raise Exception("All RPC endpoints failed: " + "; ".join(errors))
+
+	def close(self):
+		with self._lock:
+			for session in self._sessions.values():
+				session.close()
+			self._sessions.clear()
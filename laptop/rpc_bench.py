@@ -0,0 +1,203 @@
+# rpc_bench.py
+# A local stub of the Solana JSON-RPC API and benchmarks of the wallet's
+# RPC use against it. The stub answers the handful of methods the wallet
+# calls with fixed values and counts the TCP connections it accepts, so
+# connection reuse shows up as a handshake count.
+#
+#   python rpc_bench.py [calls] [payout endpoint]
+#
+# The payout benchmark runs against the stub unless an endpoint such as
+# "local" (solana-test-validator) is given; round trips are only counted
+# on the stub.
+
+import base64
+import json
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BLOCKHASH = "11111111111111111111111111111111"
+SIGNATURE = "1" * 64
+
+def _context(value, slot=1):
+	return {"context": {"slot": slot}, "value": value}
+
+class StubRpcServer(ThreadingHTTPServer):
+	"""JSON-RPC stub on 127.0.0.1, url is its endpoint"""
+	daemon_threads = True
+
+	def __init__(self, port=0, latency=0.0):
+		super().__init__(("127.0.0.1", port), _Handler)
+		self.latency = latency
+		# HTTP status to answer every request with instead, e.g. 503
+		self.fail_status = None
+		self.connections = 0
+		self.round_trips = 0
+		self.requests = 0
+		self.balance = 5_000_000_000
+		self.fee = 5000
+		self.block_height = 100
+		self.results = {
+			"getBalance": lambda params: _context(self.balance),
+			"getLatestBlockhash": lambda params: _context({
+				"blockhash": BLOCKHASH, "lastValidBlockHeight": self.block_height + 150}),
+			"getFeeForMessage": lambda params: _context(self.fee),
+			"getBlockHeight": lambda params: self.block_height,
+			"sendTransaction": self._send_transaction,
+			"getSignatureStatuses": lambda params: _context([
+				{"slot": 1, "confirmations": None, "err": None, "status": {"Ok": None},
+				"confirmationStatus": "finalized"} for _ in params[0]]),
+		}
+		self.transactions = 0
+		self.url = "http://127.0.0.1:%d" % self.server_address[1]
+		self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+		self.thread.start()
+
+	def _send_transaction(self, params):
+		# The signature of the transaction sent, as a real node returns
+		import base58
+		self.transactions += 1
+		tx = base64.b64decode(params[0])
+		return base58.b58encode(tx[1:65]).decode()
+
+	def get_request(self):
+		request = super().get_request()
+		self.connections += 1
+		return request
+
+	def answer(self, body):
+		self.requests += 1
+		method = self.results.get(body.get("method"))
+		if method is None:
+			return {"jsonrpc": "2.0", "id": body.get("id"),
+				"error": {"code": -32601, "message": "Method not found"}}
+		return {"jsonrpc": "2.0", "id": body.get("id"), "result": method(body.get("params", []))}
+
+	def close(self):
+		self.shutdown()
+		self.server_close()
+
+class _Handler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+	disable_nagle_algorithm = True
+
+	def do_POST(self):
+		body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+		self.server.round_trips += 1
+		if self.server.fail_status:
+			self.send_response(self.server.fail_status)
+			self.send_header("Content-Length", "0")
+			self.end_headers()
+			return
+		if self.server.latency:
+			time.sleep(self.server.latency)
+		if isinstance(body, list):
+			reply = [self.server.answer(b) for b in body]
+		else:
+			reply = self.server.answer(body)
+		data = json.dumps(reply).encode()
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+	def log_message(self, *args):
+		pass
+
+def unused_url():
+	"""URL of a local port nothing listens on, for failover runs"""
+	with socket.socket() as s:
+		s.bind(("127.0.0.1", 0))
+		return "http://127.0.0.1:%d" % s.getsockname()[1]
+
+def percentiles(times):
+	times = sorted(times)
+	n = len(times)
+	return times[n // 2], times[min(n - 1, n * 99 // 100)]
+
+def bench_balance(server, calls=200):
+	"""get_balance latency and handshakes: Client per call vs the pool"""
+	from solana.rpc.api import Client
+	from solders.pubkey import Pubkey
+	from rpc import RpcPool
+	pubkey = Pubkey.default()
+
+	def run(get_balance):
+		start_connections = server.connections
+		times = []
+		for _ in range(calls):
+			start = time.perf_counter()
+			get_balance(pubkey)
+			times.append((time.perf_counter() - start) * 1000)
+		return (server.connections - start_connections,) + percentiles(times)
+
+	def per_call(pubkey):
+		# What the wallet used to do: a new Client, and so a new
+		# connection, for every call
+		Client(server.url).get_balance(pubkey)
+
+	pool = RpcPool([server.url])
+	try:
+		after = run(lambda pubkey: pool.get_balance(pubkey))
+	finally:
+		pool.close()
+	pool = RpcPool([unused_url(), server.url])
+	try:
+		failover = run(lambda pubkey: pool.get_balance(pubkey))
+	finally:
+		pool.close()
+	return {"client per call": run(per_call), "pooled": after, "pooled, first endpoint down": failover}
+
+def bench_payout(server, recipients=100, url=None):
+	"""
+	Paying many recipients with send_sol one by one vs one send_batch,
+	through a loopback device. url points the wallet at another endpoint,
+	e.g. a local test validator, instead of the stub (the device wallet
+	must then be funded). Returns {name: (seconds, round trips, txs)}.
+	"""
+	from pico import wallet
+	from loopback import LoopbackSerial
+	from solders.pubkey import Pubkey
+	addresses = [str(Pubkey.new_unique()) for _ in range(recipients)]
+	w = wallet(LoopbackSerial(timeout=5), endpoints=[url or server.url])
+	try:
+		w.create_wallet("bench", "pw", "pw", progress=lambda text: None)
+		w.unlock("pw")
+
+		def run(pay):
+			round_trips, transactions = server.round_trips, server.transactions
+			start = time.perf_counter()
+			pay()
+			return (time.perf_counter() - start,
+				server.round_trips - round_trips, server.transactions - transactions)
+
+		def one_by_one():
+			for address in addresses:
+				w.send_sol("pw", address, 0.001)
+
+		results = {"send_sol x%d" % recipients: run(one_by_one)}
+		results["send_batch"] = run(lambda: w.send_batch("pw", [(a, 0.001) for a in addresses]))
+		return results
+	finally:
+		w.delete_wallet("pw")
+		w.close()
+
+if __name__ == "__main__":
+	calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+	payout_url = None
+	if len(sys.argv) > 2:
+		from rpc import resolve_endpoints
+		payout_url = resolve_endpoints(sys.argv[2])[0]
+	server = StubRpcServer()
+	try:
+		for name, (handshakes, p50, p99) in bench_balance(server, calls).items():
+			print("%-28s %4d handshakes  p50 %.2f ms  p99 %.2f ms" % (name, handshakes, p50, p99))
+		# Payouts with 20 ms of simulated network latency per request
+		server.latency = 0.02
+		for name, (seconds, round_trips, transactions) in bench_payout(server, url=payout_url).items():
+			print("%-28s %6.2f s  %4d round trips  %3d transactions" % (name, seconds, round_trips, transactions))
+	finally:
+		server.close()
@@ -0,0 +1,125 @@
+# test_rpc.py
+# RpcPool against the local stub server in rpc_bench.py: batching,
+# connection reuse and endpoint failover. No network needed.
+#
+#   python -m unittest test_rpc      (from laptop/)
+
+import unittest
+from solders.commitment_config import CommitmentLevel
+from solders.pubkey import Pubkey
+from solders.rpc.config import RpcContextConfig
+from solders.rpc.requests import GetBalance, GetLatestBlockhash, GetSlot
+from solders.rpc.responses import GetBalanceResp, GetLatestBlockhashResp, GetSlotResp
+from solders.signature import Signature
+from rpc import RpcPool, RpcError, MAX_STATUS_QUERY
+from rpc_bench import StubRpcServer, unused_url
+
+class StubTest(unittest.TestCase):
+
+	def setUp(self):
+		self.servers = []
+
+	def tearDown(self):
+		for server in self.servers:
+			server.close()
+
+	def stub(self):
+		server = StubRpcServer()
+		self.servers.append(server)
+		return server
+
+	def pool(self, urls, **kwargs):
+		pool = RpcPool(urls, timeout=2, **kwargs)
+		self.addCleanup(pool.close)
+		return pool
+
+class BatchTest(StubTest):
+
+	def test_batch_is_one_round_trip(self):
+		server = self.stub()
+		pool = self.pool([server.url])
+		config = RpcContextConfig(commitment=CommitmentLevel.Finalized)
+		responses = pool.batch(
+			[GetBalance(Pubkey.default(), config, 0), GetLatestBlockhash(config, 1)],
+			[GetBalanceResp, GetLatestBlockhashResp])
+		self.assertEqual(server.round_trips, 1)
+		self.assertEqual(server.requests, 2)
+		self.assertIsInstance(responses[0], GetBalanceResp)
+		self.assertEqual(responses[0].value, server.balance)
+		self.assertIsInstance(responses[1], GetLatestBlockhashResp)
+		self.assertEqual(responses[1].value.last_valid_block_height, server.block_height + 150)
+
+	def test_batch_keeps_error_entries(self):
+		server = self.stub()
+		pool = self.pool([server.url])
+		responses = pool.batch([GetBalance(Pubkey.default(), None, 0), GetSlot(None, 1)],
+			[GetBalanceResp, GetSlotResp])
+		self.assertIsInstance(responses[0], GetBalanceResp)
+		self.assertNotIsInstance(responses[1], GetSlotResp)
+
+	def test_signature_statuses_chunks_in_one_batch(self):
+		server = self.stub()
+		pool = self.pool([server.url])
+		signatures = [Signature.default()] * (MAX_STATUS_QUERY + 10)
+		statuses, height = pool.signature_statuses(signatures)
+		self.assertEqual(server.round_trips, 1)
+		self.assertEqual(server.requests, 3)
+		self.assertEqual(statuses, ["finalized"] * len(signatures))
+		self.assertEqual(height, server.block_height)
+
+	def test_session_is_reused(self):
+		server = self.stub()
+		pool = self.pool([server.url])
+		for _ in range(20):
+			pool.get_balance(Pubkey.default())
+		self.assertEqual(server.connections, 1)
+
+class FailoverTest(StubTest):
+
+	def test_unreachable_endpoint_is_skipped(self):
+		server = self.stub()
+		pool = self.pool([unused_url(), server.url])
+		self.assertEqual(pool.get_balance(Pubkey.default()).value, server.balance)
+
+	def test_failed_endpoint_cools_down(self):
+		first, second = self.stub(), self.stub()
+		first.fail_status = 503
+		pool = self.pool([first.url, second.url], cooldown=60)
+		pool.get_balance(Pubkey.default())
+		pool.get_balance(Pubkey.default())
+		self.assertEqual(first.round_trips, 1)
+		self.assertEqual(second.round_trips, 2)
+
+	def test_recovered_endpoint_is_preferred_again(self):
+		first, second = self.stub(), self.stub()
+		first.fail_status = 503
+		pool = self.pool([first.url, second.url], cooldown=0)
+		pool.get_balance(Pubkey.default())
+		first.fail_status = None
+		pool.get_balance(Pubkey.default())
+		self.assertEqual(first.round_trips, 2)
+		self.assertEqual(second.round_trips, 1)
+
+	def test_batch_fails_over(self):
+		first, second = self.stub(), self.stub()
+		first.fail_status = 500
+		pool = self.pool([first.url, second.url])
+		statuses, _ = pool.signature_statuses([Signature.default()])
+		self.assertEqual(statuses, ["finalized"])
+		self.assertEqual(second.round_trips, 1)
+
+	def test_all_endpoints_down(self):
+		pool = self.pool([unused_url(), unused_url()])
+		with self.assertRaisesRegex(Exception, "All RPC endpoints failed"):
+			pool.get_balance(Pubkey.default())
+
+	def test_rpc_error_does_not_fail_over(self):
+		first, second = self.stub(), self.stub()
+		pool = self.pool([first.url, second.url])
+		with self.assertRaises(RpcError):
+			pool.request(GetSlot(), GetSlotResp)
+		self.assertEqual(first.round_trips, 1)
+		self.assertEqual(second.round_trips, 0)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,315 @@
+# tracker.py
+# Websocket driven background trackers for the wallet client.
+#
+# ConfirmationTracker follows sent transactions. send_sol hands
+# each signature to a ConfirmationTracker and returns at once; the tracker
+# follows it through processed, confirmed and finalized and calls the
+# registered callbacks at every step.
+#
+# Updates come from websocket signatureSubscribe notifications. Batched
+# getSignatureStatuses polls (RpcPool.signature_statuses) take over while
+# the websocket is down and run as a slow backstop while it is up, which
+# also catches expired blockhashes. With nothing pending the websocket is
+# closed and nothing is polled.
+#
+# BalanceTracker pushes the wallet balance through an accountSubscribe on
+# its address, so changes show up within a slot and an idle wallet makes
+# no requests. getBalance is only polled while the websocket is down.
+
+import asyncio
+import threading
+from solders.commitment_config import CommitmentLevel
+from solders.pubkey import Pubkey
+from solders.rpc.responses import AccountNotification, SignatureNotification
+from solders.signature import Signature
+from solana.rpc.commitment import Processed, Confirmed, Finalized
+from solana.rpc.websocket_api import connect
+from rpc import LAMPORTS_PER_SOL
+
+LEVELS = ("processed", "confirmed", "finalized")
+_COMMITMENTS = (Processed, Confirmed, Finalized)
+_COMMITMENT_LEVELS = (CommitmentLevel.Processed, CommitmentLevel.Confirmed, CommitmentLevel.Finalized)
+
+def ws_url(http_url):
+	"""Websocket endpoint of an RPC URL; an explicit port moves up by one as on validators"""
+	scheme, rest = http_url.split("://", 1)
+	host, sep, path = rest.partition("/")
+	if ":" in host:
+		name, port = host.rsplit(":", 1)
+		host = f"{name}:{int(port) + 1}"
+	return ("wss" if scheme == "https" else "ws") + "://" + host + sep + path
+
+class _Background:
+	"""Event loop thread of a tracker, started on first use; runs _main()"""
+
+	def _start(self):
+		# called with self._lock held
+		if self._loop is None:
+			self._loop = asyncio.new_event_loop()
+			threading.Thread(target=self._run, daemon=True).start()
+
+	def _run(self):
+		asyncio.set_event_loop(self._loop)
+		self._task = self._loop.create_task(self._main())
+		try:
+			self._loop.run_until_complete(self._task)
+		except asyncio.CancelledError:
+			pass
+
+	def close(self):
+		if self._loop is not None:
+			self._loop.call_soon_threadsafe(lambda: self._task and self._task.cancel())
+
+class ConfirmationTracker(_Background):
+	"""
+	Follows signatures to finalization on a background thread. The thread
+	and its event loop start on the first track() call.
+	"""
+
+	def __init__(self, rpc, ws_endpoint=None, poll_interval=1.0, backstop_interval=15.0, max_backoff=30.0):
+		self.rpc = rpc
+		self.ws_endpoint = ws_endpoint or ws_url(rpc.urls[0])
+		self.poll_interval = poll_interval
+		self.backstop_interval = backstop_interval
+		self.max_backoff = max_backoff
+		self._callbacks = []
+		# signature -> [index in LEVELS reached, -1 for none; lastValidBlockHeight]
+		self._pending = {}
+		self._lock = threading.Lock()
+		self._loop = None
+		self._task = None
+		self._active = asyncio.Event()
+		self._ws = None
+		self._subscribed = set()
+
+	def add_callback(self, callback):
+		"""
+		callback(signature, status) is called from the tracker thread with
+		status one of LEVELS, "failed: <err>" or "expired"
+		"""
+		self._callbacks.append(callback)
+
+	def remove_callback(self, callback):
+		if callback in self._callbacks:
+			self._callbacks.remove(callback)
+
+	def track(self, signature, last_valid=None):
+		"""Start following signature; last_valid is its lastValidBlockHeight"""
+		signature = str(signature)
+		with self._lock:
+			self._pending.setdefault(signature, [-1, last_valid])
+			self._start()
+		self._loop.call_soon_threadsafe(self._on_track, signature)
+
+	def pending(self):
+		with self._lock:
+			return list(self._pending)
+
+	async def _main(self):
+		await asyncio.gather(self._ws_main(), self._poll_main())
+
+	def _on_track(self, signature):
+		self._active.set()
+		if self._ws is not None:
+			asyncio.ensure_future(self._subscribe(self._ws, [signature]))
+
+	def _update(self, signature, status):
+		with self._lock:
+			entry = self._pending.get(signature)
+			if entry is None:
+				return
+			if status in LEVELS:
+				level = LEVELS.index(status)
+				if level <= entry[0]:
+					return
+				# Notifications can overtake each other; report every step
+				steps = LEVELS[entry[0] + 1:level + 1]
+				entry[0] = level
+				done = status == "finalized"
+			else:
+				steps = (status,)
+				done = True
+			if done:
+				del self._pending[signature]
+			idle = not self._pending
+		for step in steps:
+			for callback in list(self._callbacks):
+				try:
+					callback(signature, step)
+				except Exception as e:
+					print(f"Confirmation callback failed: {e}")
+		if idle:
+			self._active.clear()
+			if self._ws is not None:
+				asyncio.ensure_future(self._ws.close())
+
+	async def _subscribe(self, ws, signatures):
+		for signature in signatures:
+			with self._lock:
+				entry = self._pending.get(signature)
+				reached = -1 if entry is None else entry[0]
+			for level in range(reached + 1, len(LEVELS)):
+				key = (signature, level)
+				if key in self._subscribed:
+					continue
+				self._subscribed.add(key)
+				await ws.signature_subscribe(Signature.from_string(signature), _COMMITMENTS[level])
+
+	def _on_message(self, ws, msg):
+		if not isinstance(msg, SignatureNotification):
+			return
+		request = ws.subscriptions.get(msg.subscription)
+		if request is None:
+			return
+		err = getattr(msg.result.value, "err", None)
+		if err is not None:
+			self._update(str(request.signature), f"failed: {err}")
+		else:
+			for level, commitment in zip(LEVELS, _COMMITMENT_LEVELS):
+				if request.config.commitment == commitment:
+					self._update(str(request.signature), level)
+
+	async def _ws_main(self):
+		backoff = 1.0
+		while True:
+			await self._active.wait()
+			try:
+				async with connect(self.ws_endpoint) as ws:
+					self._ws = ws
+					self._subscribed = set()
+					backoff = 1.0
+					await self._subscribe(ws, self.pending())
+					async for msgs in ws:
+						for msg in msgs:
+							self._on_message(ws, msg)
+			except asyncio.CancelledError:
+				raise
+			except Exception:
+				pass
+			finally:
+				self._ws = None
+			if self._active.is_set():
+				# Dropped while work is pending: polling covers the gap
+				await asyncio.sleep(backoff)
+				backoff = min(backoff * 2, self.max_backoff)
+
+	async def _poll_main(self):
+		loop = asyncio.get_running_loop()
+		while True:
+			await self._active.wait()
+			await asyncio.sleep(self.backstop_interval if self._ws is not None else self.poll_interval)
+			signatures = self.pending()
+			if not signatures:
+				continue
+			try:
+				statuses, height = await loop.run_in_executor(None, self.rpc.signature_statuses, signatures)
+			except Exception as e:
+				print(f"Status poll failed: {e}")
+				continue
+			for signature, status in zip(signatures, statuses):
+				if status is not None:
+					self._update(signature, status)
+					continue
+				with self._lock:
+					entry = self._pending.get(signature)
+				if entry is not None and entry[1] is not None and height > entry[1]:
+					self._update(signature, "expired")
+
+class BalanceTracker(_Background):
+	"""
+	Reports the balance of one address to a callback whenever it changes.
+	watch() starts it, stop() ends the subscription.
+	"""
+
+	def __init__(self, rpc, ws_endpoint=None, max_backoff=30.0):
+		self.rpc = rpc
+		self.ws_endpoint = ws_endpoint or ws_url(rpc.urls[0])
+		self.max_backoff = max_backoff
+		self._address = None
+		self._callback = None
+		self._last = None
+		self._lock = threading.Lock()
+		self._loop = None
+		self._task = None
+		self._active = asyncio.Event()
+		self._ws = None
+
+	def watch(self, address, callback):
+		"""callback(balance_sol) from the tracker thread on every change"""
+		with self._lock:
+			changed = address != self._address
+			self._address = address
+			self._callback = callback
+			if changed:
+				self._last = None
+			self._start()
+		if changed:
+			self._loop.call_soon_threadsafe(self._restart)
+
+	def stop(self):
+		with self._lock:
+			self._address = None
+			self._callback = None
+		if self._loop is not None:
+			self._loop.call_soon_threadsafe(self._restart)
+
+	def _restart(self):
+		if self._address is None:
+			self._active.clear()
+		else:
+			self._active.set()
+		if self._ws is not None:
+			asyncio.ensure_future(self._ws.close())
+
+	def _report(self, address, lamports):
+		with self._lock:
+			if address != self._address or lamports == self._last:
+				return
+			self._last = lamports
+			callback = self._callback
+		try:
+			callback(lamports / LAMPORTS_PER_SOL)
+		except Exception as e:
+			print(f"Balance callback failed: {e}")
+
+	async def _poll(self, address):
+		loop = asyncio.get_running_loop()
+		try:
+			resp = await loop.run_in_executor(None, self.rpc.get_balance, Pubkey.from_string(address))
+		except Exception as e:
+			print(f"Balance poll failed: {e}")
+			return
+		self._report(address, resp.value)
+
+	async def _main(self):
+		backoff = 1.0
+		while True:
+			await self._active.wait()
+			address = self._address
+			if address is None:
+				# stop() ran but its _restart has not yet; wait() on a set
+				# Event would return without yielding and spin here
+				self._active.clear()
+				continue
+			try:
+				async with connect(self.ws_endpoint) as ws:
+					self._ws = ws
+					await ws.account_subscribe(Pubkey.from_string(address), Confirmed)
+					# Catch up on anything that changed while unsubscribed
+					await self._poll(address)
+					backoff = 1.0
+					async for msgs in ws:
+						for msg in msgs:
+							if isinstance(msg, AccountNotification):
+								self._report(address, msg.result.value.lamports)
+			except asyncio.CancelledError:
+				raise
+			except Exception:
+				pass
+			finally:
+				self._ws = None
+			if self._active.is_set() and self._address == address:
+				# Websocket lost: poll once per reconnect attempt meanwhile
+				await self._poll(address)
+				await asyncio.sleep(backoff)
+				backoff = min(backoff * 2, self.max_backoff)
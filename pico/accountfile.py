@@ -0,0 +1,118 @@
+# accountfile.py
+# On-flash index of derived account public keys, so an account's address
+# is one seek and one read instead of a SLIP-0010 derivation plus a
+# base-point multiplication. Layout:
+#
+#   magic "PPAC" (4) | version (1) | wallet public key (32) |
+#   slot of account 0 (48) | account 1 (48) | ...
+#
+# A slot is the account's public key (32) and a tag (16), the first half
+# of HMAC-SHA256 over wallet public key, account number and public key,
+# keyed by index_key(seed). Without the seed a slot cannot be forged, so
+# a key swapped in on flash fails the check and reads as missing.
+# Account n lives at a fixed offset, an all-zero slot is one that has not
+# been derived yet. The wallet public key ties the index to the wallet
+# that made it; an index for any other wallet is ignored and replaced.
+
+import os
+import struct
+from kdf import hmac_sha256,equal
+
+MAGIC=b"PPAC"
+VERSION=2
+HEADER=">4sB32s"
+HEADER_SIZE=struct.calcsize(HEADER)
+KEY_SIZE=32
+TAG_SIZE=16
+SLOT_SIZE=KEY_SIZE+TAG_SIZE
+MAX_ACCOUNTS=1024
+_EMPTY=bytes(SLOT_SIZE)
+
+def index_key(seed):
+    """MAC key for the slots, derived from the wallet seed"""
+    return hmac_sha256(seed,b"picopot-account-index")
+
+def _tag(mac_key,owner,n,publickey):
+    return hmac_sha256(mac_key,owner+struct.pack(">I",n)+publickey)[:TAG_SIZE]
+
+def slot(mac_key,owner,n,publickey):
+    """The stored form of account n"""
+    return publickey+_tag(mac_key,owner,n,publickey)
+
+def _check(mac_key,owner,n,data):
+    if len(data)<SLOT_SIZE or data==_EMPTY:
+        return None
+    publickey=data[:KEY_SIZE]
+    if not equal(_tag(mac_key,owner,n,publickey),data[KEY_SIZE:]):
+        return None
+    return publickey
+
+def _owned(file,owner):
+    header=file.read(HEADER_SIZE)
+    if len(header)<HEADER_SIZE:
+        return False
+    magic,version,key=struct.unpack(HEADER,header)
+    return magic==MAGIC and version==VERSION and key==owner
+
+def lookup(path,owner,mac_key,n):
+    """Public key of account n, None if it is not in the index or fails its tag"""
+    try:
+        with open(path,"rb") as file:
+            if not _owned(file,owner):
+                return None
+            file.seek(HEADER_SIZE+n*SLOT_SIZE)
+            data=file.read(SLOT_SIZE)
+    except OSError:
+        return None
+    return _check(mac_key,owner,n,data)
+
+def store(path,owner,mac_key,n,publickey):
+    """Add account n to the index, starting a new one if needed"""
+    try:
+        with open(path,"rb") as file:
+            owned=_owned(file,owner)
+        size=os.stat(path)[6]
+    except OSError:
+        owned=False
+    if not owned:
+        with open(path,"wb") as file:
+            file.write(struct.pack(HEADER,MAGIC,VERSION,owner))
+        size=HEADER_SIZE
+    data=slot(mac_key,owner,n,publickey)
+    offset=HEADER_SIZE+n*SLOT_SIZE
+    if offset>=size:
+        # Appending keeps the write to one place; holes are zero slots
+        with open(path,"ab") as file:
+            file.write(bytes(offset-size))
+            file.write(data)
+    else:
+        with open(path,"r+b") as file:
+            file.seek(offset)
+            file.write(data)
+
+def entries(path,owner,mac_key,start=0,limit=MAX_ACCOUNTS):
+    """[(n, public key)] for up to limit indexed accounts from start on"""
+    found=[]
+    try:
+        with open(path,"rb") as file:
+            if not _owned(file,owner):
+                return found
+            n=start
+            file.seek(HEADER_SIZE+n*SLOT_SIZE)
+            while len(found)<limit:
+                data=file.read(SLOT_SIZE)
+                if len(data)<SLOT_SIZE:
+                    break
+                publickey=_check(mac_key,owner,n,data)
+                if publickey is not None:
+                    found.append((n,publickey))
+                n+=1
+    except OSError:
+        pass
+    return found
+
+def remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
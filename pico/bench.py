@@ -0,0 +1,194 @@
+# bench.py
+# Simple sign + verify speed test, runs on the Pico and on the laptop
+
+import time
+import ed25519_pico as ed
+import accountfile
+import chacha20poly1305 as aead
+import kdf
+import slip10
+import sha512 as sha
+from sha512 import sha512
+
+try:
+    import hashlib
+except ImportError:
+    hashlib = None
+
+try:
+    _ticks = time.ticks_us
+    _diff = time.ticks_diff
+except AttributeError:
+    _ticks = lambda: int(time.perf_counter() * 1000000)
+    _diff = lambda a, b: a - b
+
+SEED = bytes(range(32))
+MSG = b"picopot benchmark message"
+
+def timeit(fn, n=5):
+    """Average milliseconds per call"""
+    start = _ticks()
+    for _ in range(n):
+        fn()
+    return _diff(_ticks(), start) / n / 1000
+
+def bench_ed25519(n=5):
+    start = _ticks()
+    ed.base_table()
+    print("base table (w=%d): %.2f ms" % (ed.BASE_WINDOW, _diff(_ticks(), start) / 1000))
+    _, pub = ed.generate_keypair(SEED)
+    sig = ed.sign(SEED, MSG)
+    print("generate_keypair: %.2f ms" % timeit(lambda: ed.generate_keypair(SEED), n))
+    print("sign:             %.2f ms" % timeit(lambda: ed.sign(SEED, MSG), n))
+    key = ed.SigningKey(SEED)
+    print("SigningKey.sign:  %.2f ms" % timeit(lambda: key.sign(MSG), n))
+    key.wipe()
+    print("verify:           %.2f ms" % timeit(lambda: ed.verify(pub, MSG, sig), n))
+
+def bench_secret_mult(n=30):
+    """Mean and standard deviation of [r]B latency for each secret mode"""
+    import os
+    scalars = [int.from_bytes(os.urandom(32), "little") for _ in range(n)]
+    mode = ed.SECRET_MULT
+    for m in ("vartime", "window", "ladder"):
+        ed.set_secret_mult(m)
+        samples = []
+        for e in scalars:
+            start = _ticks()
+            ed.scalarmult_secret(e)
+            samples.append(_diff(_ticks(), start) / 1000)
+        mean = sum(samples) / n
+        var = sum((x - mean) ** 2 for x in samples) / n
+        print("%-8s mean %7.2f ms  stdev %6.3f ms  (%.1f%%)"
+              % (m, mean, var ** 0.5, 100 * var ** 0.5 / mean))
+    ed.set_secret_mult(mode)
+
+def bench_limb_field(n=3):
+    """
+    ed25519 on the engine main.py selects at boot, next to the int
+    figures above. On an RP2040 this is the engine the wallet signs with.
+    """
+    if ed.select_engine() != "limb":
+        print("limb field:       not available on this build")
+        return
+    try:
+        print("limb field:")
+        bench_ed25519(n)
+        bench_secret_mult(n * 3)
+    finally:
+        ed.use_limb_field(False)
+
+def bench_sha512(size=16384, n=3):
+    """SHA-512 throughput in KB/s, against hashlib where available"""
+    data = bytes(size)
+    print("sha512 KAT:       %s, using %s" % (sha.check_backends(), sha.BACKEND))
+    ms = timeit(lambda: sha512(data).digest(), n)
+    print("sha512 (%d B):    %.1f KB/s" % (size, size / ms))
+    ms = timeit(lambda: sha.sha512_digest(data), n)
+    print("sha512_digest:    %.1f KB/s" % (size / ms))
+    if hashlib is not None and hasattr(hashlib, "sha512"):
+        ms = timeit(lambda: hashlib.sha512(data).digest(), n)
+        print("hashlib.sha512:   %.1f KB/s" % (size / ms))
+
+def bench_sha512_blocks(blocks=32):
+    """Time per 128-byte block for each SHA-512 backend, cycles on the Pico"""
+    try:
+        import machine
+        mhz = machine.freq() / 1000000
+    except ImportError:
+        mhz = None
+    data = bytes(128 * blocks)
+    for name, factory in sha.BACKENDS:
+        if not sha.self_test(factory):
+            print("%-9s failed KAT" % name)
+            continue
+        start = _ticks()
+        factory(data).digest()
+        us = _diff(_ticks(), start) / (blocks + 1)
+        if mhz:
+            print("%-9s %9.1f us/block %10.0f cycles/block" % (name, us, us * mhz))
+        else:
+            print("%-9s %9.1f us/block" % (name, us))
+
+def bench_batch(sizes=(1, 10, 100)):
+    """Signatures per second, one-by-one verify vs verify_batch"""
+    keys = [ed.SigningKey(bytes([i]) * 32) for i in range(16)]
+    items = []
+    for size in sizes:
+        while len(items) < size:
+            key = keys[len(items) % len(keys)]
+            msg = MSG + str(len(items)).encode()
+            items.append((key.public_key, msg, key.sign(msg)))
+        batch = items[:size]
+        start = _ticks()
+        for pub, msg, sig in batch:
+            ed.verify(pub, msg, sig)
+        single = _diff(_ticks(), start)
+        start = _ticks()
+        ed.verify_batch(batch)
+        batched = _diff(_ticks(), start)
+        print("batch %5d: verify %8.0f sig/s  verify_batch %8.0f sig/s"
+              % (size, size * 1000000 / single, size * 1000000 / batched))
+    for key in keys:
+        key.wipe()
+
+def bench_kdf(iterations=1000):
+    """PBKDF2 rate and the iteration count a new wallet would get here"""
+    ms = timeit(lambda: kdf.pbkdf2_hmac_sha256(b"password", bytes(16), iterations), 1)
+    print("pbkdf2    %9.0f iterations/s" % (iterations * 1000 / ms))
+    print("calibrate %9d iterations for %d ms" % (kdf.calibrate(), kdf.TARGET_MS))
+
+def bench_aead(sizes=(32, 1024)):
+    """Seal cost per backend against the old repeated-key XOR"""
+    key = bytes(range(32))
+    nonce = bytes(12)
+    for size in sizes:
+        data = bytes(size)
+        us = timeit(lambda: bytes([data[i] ^ key[i % 32] for i in range(size)]), 20) * 1000
+        print("%-12s %5d bytes %9.1f us" % ("xor", size, us))
+        buf = bytearray(size)
+        for name, backend in aead.BACKENDS:
+            us = timeit(lambda: backend.encrypt(key, nonce, buf), 20) * 1000
+            print("%-12s %5d bytes %9.1f us  %8.0f KiB/s" % (name, size, us, size * 1000000 / us / 1024))
+
+def bench_hd(counts=(10, 100, 1000)):
+    """Cost of an account key derived from scratch vs read from the index"""
+    if not slip10.self_test():
+        print("slip10 FAILED the SLIP-0010 vectors")
+        return
+    root = slip10.derive(slip10.master_key(SEED), slip10.SOLANA_ROOT)
+    print("derive    %9.1f ms/account (SLIP-0010 from m/44'/501')"
+          % timeit(lambda: slip10.derive(root, slip10.account_path(7)), 5))
+    print("pubkey    %9.1f ms/account (derive + SigningKey)"
+          % timeit(lambda: ed.SigningKey(slip10.derive(root, slip10.account_path(7))[0]).public_key, 2))
+
+    path = "bench_accounts.dat"
+    owner = bytes(32)
+    mac_key = accountfile.index_key(SEED)
+    for count in counts:
+        count = min(count, accountfile.MAX_ACCOUNTS)
+        accountfile.remove(path)
+        # Fill the index in one go; the keys only have to be non-zero
+        accountfile.store(path, owner, mac_key, 0, bytes([1]) * 32)
+        with open(path, "ab") as file:
+            for n in range(1, count):
+                file.write(accountfile.slot(mac_key, owner, n, bytes([1]) * 32))
+        last = timeit(lambda: accountfile.lookup(path, owner, mac_key, count - 1), 20) * 1000
+        listed = timeit(lambda: accountfile.entries(path, owner, mac_key), 2)
+        print("index %5d: lookup last %7.1f us  list all %7.1f ms" % (count, last, listed))
+    accountfile.remove(path)
+
+if __name__ == "__main__":
+    import sys
+    print("int field:")
+    bench_ed25519()
+    bench_secret_mult()
+    bench_limb_field()
+    bench_sha512()
+    bench_sha512_blocks()
+    bench_kdf()
+    bench_aead()
+    bench_hd()
+    # e.g. "python bench.py 1 10 100 1000 10000" on the laptop
+    sizes = [int(n) for n in sys.argv[1:]]
+    bench_batch(sizes or (1, 10, 100))
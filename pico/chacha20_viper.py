@@ -0,0 +1,79 @@
+# chacha20_viper.py
+# ChaCha20 keystream for MicroPython with the block function compiled by
+# the viper emitter. The state and working words live in preallocated
+# array('I') buffers, so a block runs in machine words and allocates
+# nothing. The keystream is XORed straight into the caller's buffer in
+# byte lanes: the RP2040's Cortex-M0+ faults on unaligned word loads and a
+# memoryview slice need not be word aligned.
+# Only importable under MicroPython; chacha20poly1305.py registers it as a
+# backend.
+
+import micropython
+import struct
+from array import array
+
+_S = array('I', bytes(64))
+_X = array('I', bytes(64))
+# Word indexes of the eight quarter rounds in a double round
+_Q = bytes((0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15,
+            0, 5, 10, 15, 1, 6, 11, 12, 2, 7, 8, 13, 3, 4, 9, 14))
+
+@micropython.viper
+def _xor_stream(state, buf, n: int):
+    s = ptr32(state)
+    x = ptr32(_X)
+    q = ptr8(_Q)
+    p = ptr8(buf)
+
+    pos = 0
+    while pos < n:
+        for i in range(16):
+            x[i] = s[i]
+        for _ in range(10):
+            for j in range(0, 32, 4):
+                ia = int(q[j])
+                ib = int(q[j + 1])
+                ic = int(q[j + 2])
+                id = int(q[j + 3])
+                a = uint(x[ia])
+                b = uint(x[ib])
+                c = uint(x[ic])
+                d = uint(x[id])
+                a = a + b
+                d = d ^ a
+                d = (d << 16) | (d >> 16)
+                c = c + d
+                b = b ^ c
+                b = (b << 12) | (b >> 20)
+                a = a + b
+                d = d ^ a
+                d = (d << 8) | (d >> 24)
+                c = c + d
+                b = b ^ c
+                b = (b << 7) | (b >> 25)
+                x[ia] = a
+                x[ib] = b
+                x[ic] = c
+                x[id] = d
+
+        for i in range(16):
+            k = uint(x[i]) + uint(s[i])
+            j = pos + 4 * i
+            if j + 4 <= n:
+                p[j] = uint(p[j]) ^ (k & 0xff)
+                p[j + 1] = uint(p[j + 1]) ^ ((k >> 8) & 0xff)
+                p[j + 2] = uint(p[j + 2]) ^ ((k >> 16) & 0xff)
+                p[j + 3] = uint(p[j + 3]) ^ (k >> 24)
+            else:
+                while j < n:
+                    p[j] = uint(p[j]) ^ (k & 0xff)
+                    k = k >> 8
+                    j += 1
+        s[12] = uint(s[12]) + 1
+        pos += 64
+
+def chacha20_xor(key, counter, nonce, buf):
+    """XOR the ChaCha20 keystream into buf in place"""
+    struct.pack_into("<4I32sI12s", _S, 0, 0x61707865, 0x3320646e, 0x79622d32, 0x6b206574,
+                     key, counter, nonce)
+    _xor_stream(_S, buf, len(buf))
@@ -0,0 +1,241 @@
+# chacha20poly1305.py
+# ChaCha20-Poly1305 AEAD (RFC 8439) for sealing the wallet seed. The same
+# file is used on both sides (laptop/chacha20poly1305.py is a copy), so
+# keep it plain Python that runs under CPython and MicroPython.
+#
+# encrypt() and decrypt() work in place on a bytearray or memoryview: the
+# keystream is XORed into the caller's buffer a 32-bit word at a time and
+# nothing is hex encoded on the way. Backends are tried fastest first, as
+# in sha512.py: the cryptography package on the laptop, the viper stream
+# in chacha20_viper.py on the Pico, and the pure-Python code below.
+
+import struct
+
+KEY_SIZE = 32
+NONCE_SIZE = 12
+TAG_SIZE = 16
+
+_MASK = 0xffffffff
+_P1305 = (1 << 130) - 5
+_CLAMP = 0x0ffffffc0ffffffc0ffffffc0fffffff
+_SIGMA = (0x61707865, 0x3320646e, 0x79622d32, 0x6b206574)  # "expand 32-byte k"
+_ZERO16 = bytes(16)
+
+def state(key, counter, nonce):
+    """The 16-word ChaCha20 input block"""
+    return list(_SIGMA) + list(struct.unpack("<8I", key)) + [counter] + list(struct.unpack("<3I", nonce))
+
+def _quarter(x, a, b, c, d):
+    xa = (x[a] + x[b]) & _MASK
+    xd = x[d] ^ xa
+    xd = ((xd << 16) | (xd >> 16)) & _MASK
+    xc = (x[c] + xd) & _MASK
+    xb = x[b] ^ xc
+    xb = ((xb << 12) | (xb >> 20)) & _MASK
+    xa = (xa + xb) & _MASK
+    xd ^= xa
+    xd = ((xd << 8) | (xd >> 24)) & _MASK
+    xc = (xc + xd) & _MASK
+    xb ^= xc
+    x[a] = xa
+    x[b] = ((xb << 7) | (xb >> 25)) & _MASK
+    x[c] = xc
+    x[d] = xd
+
+def block(s):
+    """Keystream words for input block s"""
+    x = list(s)
+    for _ in range(10):
+        _quarter(x, 0, 4, 8, 12)
+        _quarter(x, 1, 5, 9, 13)
+        _quarter(x, 2, 6, 10, 14)
+        _quarter(x, 3, 7, 11, 15)
+        _quarter(x, 0, 5, 10, 15)
+        _quarter(x, 1, 6, 11, 12)
+        _quarter(x, 2, 7, 8, 13)
+        _quarter(x, 3, 4, 9, 14)
+    return [(x[i] + s[i]) & _MASK for i in range(16)]
+
+def chacha20_xor(key, counter, nonce, buf):
+    """XOR the ChaCha20 keystream into buf in place"""
+    mv = memoryview(buf)
+    s = state(key, counter, nonce)
+    n = len(mv)
+    pos = 0
+    while n - pos >= 64:
+        ks = block(s)
+        words = struct.unpack_from("<16I", mv, pos)
+        struct.pack_into("<16I", mv, pos, *[w ^ k for w, k in zip(words, ks)])
+        s[12] = (s[12] + 1) & _MASK
+        pos += 64
+    if pos < n:
+        ks = struct.pack("<16I", *block(s))
+        for i in range(n - pos):
+            mv[pos + i] ^= ks[i]
+
+def _absorb(acc, r, data):
+    # Zero-padded 16-byte blocks, as the AEAD construction feeds Poly1305
+    mv = memoryview(data)
+    for i in range(0, len(mv), 16):
+        chunk = bytes(mv[i:i + 16])
+        if len(chunk) < 16:
+            chunk += _ZERO16[len(chunk):]
+        acc = (acc + int.from_bytes(chunk, "little") + (1 << 128)) * r % _P1305
+    return acc
+
+def tag(otk, aad, ciphertext):
+    """Poly1305 tag over aad and ciphertext under the one-time key otk"""
+    r = int.from_bytes(bytes(otk[:16]), "little") & _CLAMP
+    acc = _absorb(0, r, aad)
+    acc = _absorb(acc, r, ciphertext)
+    acc = _absorb(acc, r, struct.pack("<QQ", len(aad), len(ciphertext)))
+    acc += int.from_bytes(bytes(otk[16:32]), "little")
+    return (acc & ((1 << 128) - 1)).to_bytes(16, "little")
+
+def equal(a, b):
+    """Compare without an early exit"""
+    if len(a) != len(b):
+        return False
+    diff = 0
+    for i in range(len(a)):
+        diff |= a[i] ^ b[i]
+    return diff == 0
+
+class StreamBackend:
+    """The AEAD construction on top of a chacha20_xor(key, counter, nonce, buf)"""
+
+    def __init__(self, xor):
+        self.xor = xor
+
+    def _otk(self, key, nonce):
+        otk = bytearray(32)
+        self.xor(key, 0, nonce, otk)
+        return otk
+
+    def encrypt(self, key, nonce, buf, aad=b""):
+        self.xor(key, 1, nonce, buf)
+        return tag(self._otk(key, nonce), aad, buf)
+
+    def decrypt(self, key, nonce, buf, mac, aad=b""):
+        # Check before touching buf, a forged message is left as it was
+        if not equal(tag(self._otk(key, nonce), aad, buf), mac):
+            return False
+        self.xor(key, 1, nonce, buf)
+        return True
+
+class CryptographyBackend:
+    """cryptography's ChaCha20Poly1305; it returns new bytes, copied back into buf"""
+
+    def __init__(self, cls, invalid):
+        self.cls = cls
+        self.invalid = invalid
+
+    def encrypt(self, key, nonce, buf, aad=b""):
+        out = self.cls(bytes(key)).encrypt(bytes(nonce), bytes(buf), bytes(aad))
+        buf[:] = out[:-TAG_SIZE]
+        return out[-TAG_SIZE:]
+
+    def decrypt(self, key, nonce, buf, mac, aad=b""):
+        try:
+            out = self.cls(bytes(key)).decrypt(bytes(nonce), bytes(buf) + bytes(mac), bytes(aad))
+        except self.invalid:
+            return False
+        buf[:] = out
+        return True
+
+# Known-answer tests, (key, nonce, aad, plaintext, ciphertext + tag). The
+# first is RFC 8439 section 2.8.2; the others are wallet-shaped (a 32-byte
+# seed under a record header) and cover a one-block and a multi-block
+# message with a tail. Both sides check their backends against these, so
+# a seed sealed on one side opens on the other.
+KAT = (
+    (bytes(range(0x80, 0xa0)),
+     bytes.fromhex("070000004041424344454647"),
+     bytes.fromhex("50515253c0c1c2c3c4c5c6c7"),
+     b"Ladies and Gentlemen of the class of '99: If I could offer you only "
+     b"one tip for the future, sunscreen would be it.",
+     "d31a8d34648e60db7b86afbc53ef7ec2a4aded51296e08fea9e2b5a736ee62d6"
+     "3dbea45e8ca9671282fafb69da92728b1a71de0a9e060b2905d6a5b67ecd3b36"
+     "92ddbd7f2d778b8c9803aee328091b58fab324e4fad675945585808b4831d7bc"
+     "3ff4def08e4b7a9de576d26586cec64b6116"
+     "1ae10b594f09e26a7e902ecbd0600691"),
+    (bytes(range(1, 33)),
+     bytes(range(0xa0, 0xac)),
+     b"PPWL\x02\x04" + bytes(16) + b"\x01\x00\x00\x07\xd0" + b"test",
+     bytes(range(32)),
+     "96235bf6f55e0c6312b27e91b5441fb2a2379711929c22cb13a36cdc6f1ef82b"
+     "548306328a57ff98686d3c21a3fed85b"),
+    (bytes(range(0xff, 0xdf, -1)),
+     bytes(12),
+     b"",
+     bytes(i * 7 & 0xff for i in range(150)),
+     "f1268647d74f269cc23263492410aca0aae227ad0c391134f4a1a9061d351b43"
+     "8352981150234d057a59e3e2821c9e0fb02099e8edc2692606c3ae68e8f26e25"
+     "27d37efbdc544aed44feba09c0935bc129e7cc51975ddfced9e17977aa036ba1"
+     "dc696c3c608e286f1be99e7fdabcb0d355a753b6c53cec97e59fd5da703dd34b"
+     "bcaf0eef025d2b39a1909f459019894d289a37ea0b1efeff66b05190d52a18b1"
+     "3fe0af3aedd1"),
+)
+
+def self_test(backend):
+    """True if backend matches every KAT vector both ways"""
+    try:
+        for key, nonce, aad, plaintext, expected in KAT:
+            buf = bytearray(plaintext)
+            mac = backend.encrypt(key, nonce, buf, aad)
+            if (bytes(buf) + bytes(mac)).hex() != expected:
+                return False
+            if not backend.decrypt(key, nonce, buf, mac, aad) or buf != plaintext:
+                return False
+            buf[0] ^= 1
+            if backend.decrypt(key, nonce, buf, mac, aad):
+                return False
+        return True
+    except Exception:
+        return False
+
+# Backend registry, fastest first; the pure-Python stream is always last
+# and is the guaranteed fallback.
+BACKENDS = []
+
+def register_backend(name, backend):
+    BACKENDS.append((name, backend))
+
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305 as _ChaCha20Poly1305
+    from cryptography.exceptions import InvalidTag as _InvalidTag
+    register_backend("cryptography", CryptographyBackend(_ChaCha20Poly1305, _InvalidTag))
+except ImportError:
+    pass
+
+try:
+    import chacha20_viper as _viper
+    register_backend("viper", StreamBackend(_viper.chacha20_xor))
+except ImportError:
+    pass
+
+_python = StreamBackend(chacha20_xor)
+register_backend("python", _python)
+
+def select_backend():
+    """Pick the first registered backend that passes the KATs"""
+    global BACKEND, _backend
+    for name, backend in BACKENDS:
+        if backend is _python or self_test(backend):
+            BACKEND = name
+            _backend = backend
+            return name
+
+def check_backends():
+    """Run the KATs against every registered backend, {name: passed}"""
+    return dict((name, self_test(backend)) for name, backend in BACKENDS)
+
+select_backend()
+
+def encrypt(key, nonce, buf, aad=b""):
+    """Encrypt buf in place, returns the 16-byte tag"""
+    return _backend.encrypt(key, nonce, buf, aad)
+
+def decrypt(key, nonce, buf, mac, aad=b""):
+    """Decrypt buf in place if mac checks out; False (buf untouched) if not"""
+    return _backend.decrypt(key, nonce, buf, mac, aad)
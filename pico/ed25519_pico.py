@@ -27,41 +27,371 @@ d = -121665 * inv(121666) % q
 # Base point (standard Ed25519)
 Bx = 15112221349535400772501151409588531511454012693041857206046113283949847762202
 By = 46316835694926478169428394003475163141307993866256225615783033603165251855960
+SQRT_M1 = expmod(2, (q - 1) // 4, q)
+
+# Points are kept in extended twisted Edwards coordinates (X:Y:Z:T) with
+# x = X/Z, y = Y/Z and x*y = T/Z, so add/double need no inversion at all.
+# The only inversion happens once in encodepoint().
+d2 = 2 * d % q
+IDENTITY = (0, 1, 1, 0)
+B = (Bx, By, 1, Bx * By % q)
+
+def to_extended(P):
+    """Affine (x, y) -> extended (X, Y, Z, T)"""
+    x, y = P
+    return (x, y, 1, x * y % q)
+
+def to_affine(P):
+    """Extended (X, Y, Z, T) -> affine (x, y), one inversion"""
+    X, Y, Z, T = P
+    zi = inv(Z)
+    return (X * zi % q, Y * zi % q)
 
 def edwards_add(P, Q):
-    """Edwards addition formula"""
-    x1, y1 = P
-    x2, y2 = Q
-    
-    x1y2 = x1 * y2 % q
-    x2y1 = x2 * y1 % q
-    x1x2 = x1 * x2 % q
-    y1y2 = y1 * y2 % q
-    dx1x2y1y2 = d * x1x2 * y1y2 % q
-    
-    x3 = (x1y2 + x2y1) * inv(1 + dx1x2y1y2) % q
-    y3 = (y1y2 + x1x2) * inv(1 - dx1x2y1y2) % q
-    return (x3, y3)
+    """Extended coordinate addition (add-2008-hwcd-3, a = -1)"""
+    X1, Y1, Z1, T1 = P
+    X2, Y2, Z2, T2 = Q
+
+    A = (Y1 - X1) * (Y2 - X2) % q
+    B_ = (Y1 + X1) * (Y2 + X2) % q
+    C = T1 * d2 * T2 % q
+    D = 2 * Z1 * Z2 % q
+    E = B_ - A
+    F = D - C
+    G = D + C
+    H_ = B_ + A
+    return (E * F % q, G * H_ % q, F * G % q, E * H_ % q)
+
+def edwards_double(P):
+    """Extended coordinate doubling (dbl-2008-hwcd, a = -1)"""
+    X1, Y1, Z1, _ = P
+
+    A = X1 * X1 % q
+    B_ = Y1 * Y1 % q
+    C = 2 * Z1 * Z1 % q
+    H_ = A + B_
+    xy = X1 + Y1
+    E = H_ - xy * xy % q
+    G = A - B_
+    F = C + G
+    return (E * F % q, G * H_ % q, F * G % q, E * H_ % q)
+
+def point_equal(P, Q):
+    """Projective comparison, no inversion"""
+    X1, Y1, Z1, _ = P
+    X2, Y2, Z2, _ = Q
+    return (X1 * Z2 - X2 * Z1) % q == 0 and (Y1 * Z2 - Y2 * Z1) % q == 0
 
 def scalarmult(P, e):
-    """Double-and-add algorithm"""
-    if e == 0:
-        return (0, 1)
-    
-    Q = (0, 1)  # Identity point
+    """Double-and-add algorithm on extended points"""
+    Q = IDENTITY
     addend = P
-    
+
     while e:
         if e & 1:
             Q = edwards_add(Q, addend)
-        addend = edwards_add(addend, addend)
+        addend = edwards_double(addend)
         e >>= 1
-    
+
     return Q
 
+# Fixed-base table for B. Row i holds j * 2^(w*i) * B for j = 1..2^(w-1)
+# as affine "niels" triples (y+x, y-x, 2*d*x*y), so [e]B becomes one mixed
+# addition per w-bit signed digit of e and no doublings. The table is built
+# on first use and cached. BASE_WINDOW = 4 gives 64 rows of 8 entries
+# (512 points, roughly 64 additions per multiplication); lower it with
+# set_base_window() to fit a tighter RAM budget at the cost of more
+# additions (w = 2 -> 127 rows of 2 entries).
+BASE_WINDOW = 4
+_base_table = None
+
+def set_base_window(w):
+    """Change the fixed-base window size, dropping the cached table"""
+    global BASE_WINDOW, _base_table
+    if w < 1 or w > 8:
+        raise ValueError("Window must be 1..8")
+    BASE_WINDOW = w
+    _base_table = None
+
+def batch_inv(values):
+    """Invert many field elements with a single inversion"""
+    acc = 1
+    prefix = []
+    for v in values:
+        prefix.append(acc)
+        acc = acc * v % q
+    acc = inv(acc)
+    out = [0] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        out[i] = prefix[i] * acc % q
+        acc = acc * values[i] % q
+    return out
+
+def base_table():
+    """Return the cached fixed-base table, building it on first use"""
+    global _base_table
+    if _base_table is None:
+        w = BASE_WINDOW
+        rows = 253 // w + 1  # scalars are reduced mod l < 2^253, see base_digits()
+        half = 1 << (w - 1)
+        points = []
+        P = B
+        for _ in range(rows):
+            Q = P
+            for _ in range(half):
+                points.append(Q)
+                Q = edwards_add(Q, P)
+            for _ in range(w):
+                P = edwards_double(P)
+        zinv = batch_inv([Z for _, _, Z, _ in points])
+        table = []
+        for i in range(rows):
+            row = []
+            for j in range(half):
+                X, Y, _, _ = points[i * half + j]
+                zi = zinv[i * half + j]
+                x = X * zi % q
+                y = Y * zi % q
+                row.append(((y + x) % q, (y - x) % q, d2 * x * y % q))
+            table.append(row)
+        _base_table = table
+    return _base_table
+
+def add_niels(P, n):
+    """Mixed addition of an extended point and an affine niels triple"""
+    X1, Y1, Z1, T1 = P
+    ypx, ymx, xy2d = n
+
+    A = (Y1 - X1) * ymx % q
+    B_ = (Y1 + X1) * ypx % q
+    C = T1 * xy2d % q
+    D = 2 * Z1
+    E = B_ - A
+    F = D - C
+    G = D + C
+    H_ = B_ + A
+    return (E * F % q, G * H_ % q, F * G % q, E * H_ % q)
+
+def base_digits(e):
+    """Signed BASE_WINDOW-bit digits of e mod l, one per table row"""
+    w = BASE_WINDOW
+    half = 1 << (w - 1)
+    mask = (1 << w) - 1
+    e %= l
+
+    digits = []
+    for _ in range(253 // w + 1):
+        digit = e & mask
+        e >>= w
+        # Branch-free: carry is 1 exactly when digit > half
+        carry = (digit + half - 1) >> w
+        digit -= carry << w
+        e += carry
+        digits.append(digit)
+    return digits
+
+def scalarmult_base(e):
+    """[e]B from the fixed-base table: additions only, no doublings"""
+    table = base_table()
+
+    Q = IDENTITY
+    for row, digit in zip(table, base_digits(e)):
+        if digit > 0:
+            Q = add_niels(Q, row[digit - 1])
+        elif digit < 0:
+            ypx, ymx, xy2d = row[-digit - 1]
+            Q = add_niels(Q, (ymx, ypx, q - xy2d))
+    return Q
+
+# Joint [a]B + [b]P for verify(): Straus/Shamir with width-w NAF digits,
+# so both scalars share one run of ~253 doublings. Odd multiples of B are
+# cached as niels triples; those of P are built per call.
+NAF_WINDOW_B = 7
+NAF_WINDOW_P = 5
+_base_odd = None
+
+def edwards_neg(P):
+    X, Y, Z, T = P
+    return ((q - X) % q, Y, Z, (q - T) % q)
+
+def wnaf(e, w):
+    """Width-w non-adjacent form of e, least significant digit first"""
+    digits = []
+    half = 1 << (w - 1)
+    mask = (1 << w) - 1
+    while e:
+        if e & 1:
+            digit = e & mask
+            if digit >= half:
+                digit -= mask + 1
+            e -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        e >>= 1
+    return digits
+
+def odd_multiples(P, w):
+    """[P, 3P, 5P, ..., (2^(w-1) - 1)P] in extended coordinates"""
+    P2 = edwards_double(P)
+    out = [P]
+    for _ in range((1 << (w - 2)) - 1):
+        out.append(edwards_add(out[-1], P2))
+    return out
+
+def base_odd_multiples():
+    """Cached odd multiples of B as niels triples for double_scalarmult"""
+    global _base_odd
+    if _base_odd is None:
+        points = odd_multiples(B, NAF_WINDOW_B)
+        zinv = batch_inv([Z for _, _, Z, _ in points])
+        table = []
+        for (X, Y, _, _), zi in zip(points, zinv):
+            x = X * zi % q
+            y = Y * zi % q
+            table.append(((y + x) % q, (y - x) % q, d2 * x * y % q))
+        _base_odd = table
+    return _base_odd
+
+def double_scalarmult(a, b, P):
+    """[a]B + [b]P in one pass with shared doublings (variable time)"""
+    base = base_odd_multiples()
+    odd = odd_multiples(P, NAF_WINDOW_P)
+    na = wnaf(a, NAF_WINDOW_B)
+    nb = wnaf(b, NAF_WINDOW_P)
+
+    Q = IDENTITY
+    for i in range(max(len(na), len(nb)) - 1, -1, -1):
+        Q = edwards_double(Q)
+        if i < len(na):
+            digit = na[i]
+            if digit > 0:
+                Q = add_niels(Q, base[digit >> 1])
+            elif digit < 0:
+                ypx, ymx, xy2d = base[-digit >> 1]
+                Q = add_niels(Q, (ymx, ypx, q - xy2d))
+        if i < len(nb):
+            digit = nb[i]
+            if digit > 0:
+                Q = edwards_add(Q, odd[digit >> 1])
+            elif digit < 0:
+                Q = edwards_add(Q, edwards_neg(odd[-digit >> 1]))
+    return Q
+
+# Constant-time multiplication for secret scalars (generate_keypair, sign).
+# Both modes run the same sequence of field operations whatever the
+# scalar: "window" adds one entry per table row, picked by scanning the
+# whole row with arithmetic masks, and "ladder" is a Montgomery ladder
+# over a fixed 255 bits with arithmetic conditional swaps. "vartime" is
+# the plain scalarmult_base. Python bigint arithmetic itself is not
+# constant time, so this removes the secret-dependent branches and
+# table indexing, not every timing difference. verify() only handles
+# public scalars and keeps the variable-time double_scalarmult.
+SECRET_MULT = "window"
+
+def set_secret_mult(mode):
+    """Select "window", "ladder" or "vartime" for secret scalars"""
+    global SECRET_MULT
+    if mode not in ("window", "ladder", "vartime"):
+        raise ValueError("Unknown scalar multiplication mode")
+    SECRET_MULT = mode
+
+def scalarmult_base_ct(e):
+    """[e]B from the fixed-base table with no secret-dependent branches"""
+    table = base_table()
+
+    Q = IDENTITY
+    for row, digit in zip(table, base_digits(e)):
+        # sign and absolute value of the digit without branching
+        neg = (digit >> 8) & 1
+        absd = (digit ^ -neg) + neg
+
+        # Start from the identity niels (1, 1, 0) when absd == 0
+        z = int(absd == 0)
+        ypx, ymx, xy2d = z, z, 0
+        for j in range(len(row)):
+            m = int(j + 1 == absd)
+            ypx += m * row[j][0]
+            ymx += m * row[j][1]
+            xy2d += m * row[j][2]
+
+        # Conditionally negate: swap y+x / y-x and flip the sign of 2dxy
+        t = neg * (ypx - ymx)
+        Q = add_niels(Q, (ypx - t, ymx + t, xy2d * (1 - 2 * neg) % q))
+    return Q
+
+def cswap(P, Q, bit):
+    """Swap P and Q when bit is 1, without branching on it"""
+    out_p = []
+    out_q = []
+    for a, b in zip(P, Q):
+        t = bit * (a - b)
+        out_p.append(a - t)
+        out_q.append(b + t)
+    return tuple(out_p), tuple(out_q)
+
+def scalarmult_ladder(P, e):
+    """Montgomery ladder over a fixed 255 bits"""
+    R0 = IDENTITY
+    R1 = P
+    for i in range(254, -1, -1):
+        bit = (e >> i) & 1
+        R0, R1 = cswap(R0, R1, bit)
+        R1 = edwards_add(R0, R1)
+        R0 = edwards_double(R0)
+        R0, R1 = cswap(R0, R1, bit)
+    return R0
+
+def scalarmult_secret(e):
+    """[e]B for a secret e using the SECRET_MULT mode"""
+    if SECRET_MULT == "window":
+        return scalarmult_base_ct(e)
+    if SECRET_MULT == "ladder":
+        return scalarmult_ladder(B, e % l)
+    return scalarmult_base(e)
+
+# Scalar multiplication engines. The int versions above are the default;
+# use_limb_field() swaps in the fe25519 limb-array versions (MicroPython
+# only), which take and return the same extended int points. That covers
+# the secret-scalar paths too, so every SECRET_MULT mode follows it.
+_int_engine = (scalarmult, scalarmult_base, double_scalarmult,
+               scalarmult_base_ct, scalarmult_ladder)
+
+# "int" or "limb", the engine in use
+ENGINE = "int"
+
+def use_limb_field(enabled=True):
+    """Route scalar multiplication through fe25519 limbs, or back to ints"""
+    global scalarmult, scalarmult_base, double_scalarmult
+    global scalarmult_base_ct, scalarmult_ladder, ENGINE
+    if enabled:
+        import fe25519
+        engine = (fe25519.scalarmult, fe25519.scalarmult_base,
+                  fe25519.double_scalarmult, fe25519.scalarmult_base_ct,
+                  fe25519.scalarmult_ladder)
+    else:
+        engine = _int_engine
+    (scalarmult, scalarmult_base, double_scalarmult,
+     scalarmult_base_ct, scalarmult_ladder) = engine
+    ENGINE = "limb" if enabled else "int"
+
+def select_engine():
+    """
+    The limb engine if fe25519 imports (MicroPython with viper) and agrees
+    with the int engine on a known multiple of B, else the int engine.
+    Returns the name of the one in use.
+    """
+    try:
+        use_limb_field()
+    except ImportError:
+        return ENGINE
+    if to_affine(scalarmult(B, 0x1234567)) != to_affine(_int_engine[0](B, 0x1234567)):
+        use_limb_field(False)
+    return ENGINE
+
 # Encode/decode points
 def encodepoint(P):
-    x, y = P
+    x, y = to_affine(P)
     y_bytes = y.to_bytes(32, 'little')
     if x & 1:
         y_bytes = bytearray(y_bytes)
@@ -75,24 +405,23 @@ def decodepoint(s):
     y_bytes[31] &= 0x7F
     y = int.from_bytes(y_bytes, 'little')
     
-    # Recover x
+    # Recover x = sqrt(u/v) as u*v^3 * (u*v^7)^((q-5)/8), no inversion
     y2 = y * y % q
     u = (y2 - 1) % q
     v = (d * y2 + 1) % q
-    x2 = u * inv(v) % q
+    v3 = v * v * v % q
+    x = u * v3 * expmod(u * v3 * v3 * v, (q - 5) // 8, q) % q
     
-    x = expmod(x2, (q + 3) // 8, q)
-    if (x * x - x2) % q != 0:
-        x = (x * pow(2, (q - 1) // 4, q)) % q
+    vx2 = v * x * x % q
+    if vx2 != u:
+        if vx2 != q - u:
+            raise ValueError("Point not on curve")
+        x = x * SQRT_M1 % q
     
     if (x & 1) != sign_bit:
         x = q - x
     
-    # Verify point is on curve
-    if (-x*x + y*y - 1 - d*x*x*y*y) % q != 0:
-        raise ValueError("Point not on curve")
-    
-    return (x, y)
+    return to_extended((x, y))
 
 # BYTE-LEVEL CLAMPING - CORRECTED VERSION
 def clamp_scalar(hash_bytes):
@@ -122,33 +451,56 @@ def generate_keypair(seed=None):
     a_bytes = clamp_scalar(h[:32])
     a = int.from_bytes(a_bytes, 'little')
     
-    A = scalarmult((Bx, By), a)
+    A = scalarmult_secret(a)
     return seed, encodepoint(A)
 
+class SigningKey:
+    """Signing state derived once from a seed and reused for every signature
+
+    Holds the clamped scalar a, the nonce prefix h[32:] and the encoded
+    public key, so each sign() only costs one base-point multiplication
+    for R. Call wipe() when the wallet locks.
+    """
+
+    def __init__(self, seed):
+        if len(seed) != 32:
+            raise ValueError("Secret key must be 32 bytes")
+        h = H(seed)
+        self.a = int.from_bytes(clamp_scalar(h[:32]), 'little')
+        self.prefix = bytearray(h[32:])
+        self.public_key = encodepoint(scalarmult_secret(self.a))
+
+    def sign(self, msg):
+        if self.prefix is None:
+            raise ValueError("Signing key has been wiped")
+
+        # Compute r = H(h[32:], message) mod l
+        r = H(bytes(self.prefix) + msg)
+        r = int.from_bytes(r, 'little') % l
+
+        R_enc = encodepoint(scalarmult_secret(r))
+
+        # Compute k = H(R_enc, A_enc, message) mod l
+        k = H(R_enc + self.public_key + msg)
+        k = int.from_bytes(k, 'little') % l
+
+        S = (r + k * self.a) % l
+        return R_enc + S.to_bytes(32, 'little')
+
+    def wipe(self):
+        """Zero the cached secret; the key cannot sign afterwards"""
+        if self.prefix is not None:
+            for i in range(len(self.prefix)):
+                self.prefix[i] = 0
+        self.prefix = None
+        self.a = 0
+
 def sign(secret_key, msg):
-    if len(secret_key) != 32:
-        raise ValueError("Secret key must be 32 bytes")
-    
-    h = H(secret_key)
-    a_bytes = clamp_scalar(h[:32])
-    a = int.from_bytes(a_bytes, 'little')
-    
-    # Compute r = H(h[32:], message) mod l
-    r = H(h[32:] + msg)
-    r = int.from_bytes(r, 'little') % l
-    
-    R = scalarmult((Bx, By), r)
-    R_enc = encodepoint(R)
-    
-    A = scalarmult((Bx, By), a)
-    A_enc = encodepoint(A)
-    
-    # Compute k = H(R_enc, A_enc, message) mod l
-    k = H(R_enc + A_enc + msg)
-    k = int.from_bytes(k, 'little') % l
-    
-    S = (r + k * a) % l
-    return R_enc + S.to_bytes(32, 'little')
+    key = SigningKey(secret_key)
+    try:
+        return key.sign(msg)
+    finally:
+        key.wipe()
 
 def verify(public_key, msg, signature):
     if len(public_key) != 32 or len(signature) != 64:
@@ -165,14 +517,96 @@ def verify(public_key, msg, signature):
         k = H(signature[:32] + public_key + msg)
         k = int.from_bytes(k, 'little') % l
         
-        P1 = scalarmult((Bx, By), S)
-        P2 = edwards_add(R, scalarmult(A, k))
-        
-        return P1 == P2
+        # R == [S]B - [k]A, compared projectively
+        return point_equal(R, double_scalarmult(S, k, edwards_neg(A)))
         
     except (ValueError, Exception):
         return False
 
+def multiscalar_mult(scalars, points):
+    """Sum of [s_i]P_i with Pippenger's bucket method (variable time)"""
+    n = len(points)
+    if n == 0:
+        return IDENTITY
+    c = 4 if n < 32 else min(n.bit_length() - 2, 12)
+    mask = (1 << c) - 1
+    bits = max(s.bit_length() for s in scalars)
+
+    Q = IDENTITY
+    for shift in range((bits + c - 1) // c * c - c, -1, -c):
+        for _ in range(c):
+            Q = edwards_double(Q)
+        buckets = [None] * (mask + 1)
+        for s, P in zip(scalars, points):
+            j = (s >> shift) & mask
+            if j:
+                buckets[j] = P if buckets[j] is None else edwards_add(buckets[j], P)
+        # sum_j j * bucket[j] via running sums
+        running = IDENTITY
+        total = IDENTITY
+        for j in range(mask, 0, -1):
+            if buckets[j] is not None:
+                running = edwards_add(running, buckets[j])
+            total = edwards_add(total, running)
+        Q = edwards_add(Q, total)
+    return Q
+
+def verify_batch(items):
+    """Verify many (public_key, msg, signature) tuples at once
+
+    Checks the random linear combination
+        [-sum z_i*S_i]B + sum [z_i]R_i + sum [z_i*k_i]A_i == 0
+    with 128-bit random z_i in a single multi-scalar multiplication.
+    If that fails, every item is verified on its own to find the bad
+    ones. Returns a list of booleans, one per item.
+
+    Like other batch verifiers this uses the equation without the
+    cofactor, so it agrees with verify() except for signatures crafted
+    with small-order components, which it may accept with low
+    probability.
+    """
+    results = [False] * len(items)
+    batch = []
+    for i, (public_key, msg, signature) in enumerate(items):
+        if len(public_key) != 32 or len(signature) != 64:
+            continue
+        try:
+            A = decodepoint(public_key)
+            R = decodepoint(signature[:32])
+        except ValueError:
+            continue
+        S = int.from_bytes(signature[32:], 'little')
+        if S >= l:
+            continue
+        k = H(signature[:32] + public_key + msg)
+        k = int.from_bytes(k, 'little') % l
+        batch.append((i, A, R, S, k))
+
+    if len(batch) == 1:
+        i, A, R, S, k = batch[0]
+        results[i] = point_equal(R, double_scalarmult(S, k, edwards_neg(A)))
+        return results
+
+    if batch:
+        scalars = []
+        points = []
+        b = 0
+        for _, A, R, S, k in batch:
+            z = int.from_bytes(os.urandom(16), 'little')
+            b = (b + z * S) % l
+            scalars.append(z)
+            points.append(R)
+            scalars.append(z * k % l)
+            points.append(A)
+        scalars.append((l - b) % l)
+        points.append(B)
+
+        X, Y, Z, _ = multiscalar_mult(scalars, points)
+        ok = X % q == 0 and (Y - Z) % q == 0
+        for i, A, R, S, k in batch:
+            results[i] = ok or point_equal(R, double_scalarmult(S, k, edwards_neg(A)))
+    return results
+
 # ============================================================================
 # SOLANA COLD WALLET SPECIFIC FUNCTIONS
 # ============================================================================
@@ -185,9 +619,12 @@ def create_solana_wallet():
 
 def solana_sign_transaction(seed, transaction_data):
     """Sign Solana transaction data with seed"""
-    private_key, public_key = generate_keypair(seed)
-    signature = sign(private_key, transaction_data)
-    return signature.hex(), public_key.hex()
+    key = SigningKey(seed)
+    try:
+        signature = key.sign(transaction_data)
+        return signature.hex(), key.public_key.hex()
+    finally:
+        key.wipe()
 
 def solana_verify_signature(public_key_hex, transaction_data, signature_hex):
     """Verify Solana transaction signature"""
@@ -195,6 +632,11 @@ def solana_verify_signature(public_key_hex, transaction_data, signature_hex):
     signature_bytes = bytes.fromhex(signature_hex)
     return verify(public_key_bytes, transaction_data, signature_bytes)
 
+def solana_verify_batch(items):
+    """Verify many (public_key_hex, transaction_data, signature_hex) tuples"""
+    return verify_batch([(bytes.fromhex(pub), data, bytes.fromhex(sig))
+                         for pub, data, sig in items])
+
 def seed_to_public_key(seed_hex):
     """Get public key from seed without exposing private key (hex input)"""
     seed_bytes = bytes.fromhex(seed_hex)
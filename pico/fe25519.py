@@ -0,0 +1,352 @@
+# fe25519.py
+# GF(2^255 - 19) arithmetic on fixed-size limb arrays for MicroPython.
+#
+# A field element is an array('I') of sixteen 16-bit limbs, little-endian,
+# kept below 2^256 (not necessarily below q). Every 16x16-bit product fits
+# a 32-bit machine word, which is what viper works in and what the
+# RP2040's Cortex-M0+ multiplies natively, so multiply/square/reduce run
+# entirely in machine words with no bigint allocation. 2^256 = 38 (mod q)
+# folds the high half of a product back into the low half.
+#
+# The point routines below mirror the ones in ed25519_pico and take and
+# return the same extended (X, Y, Z, T) int tuples, so
+# ed25519_pico.use_limb_field() can swap them in behind the existing API,
+# including the constant-time table and ladder used for secret scalars.
+# Only importable under MicroPython.
+
+import micropython
+from array import array
+import ed25519_pico as ed
+
+_T = array('I', bytes(4 * 32))  # product columns for fe_mul
+
+def fe_new():
+    return array('I', bytes(64))
+
+def fe_from_int(x, r=None):
+    if r is None:
+        r = fe_new()
+    x %= ed.q
+    for i in range(16):
+        r[i] = (x >> (16 * i)) & 0xffff
+    return r
+
+def fe_to_int(f):
+    x = 0
+    for i in range(15, -1, -1):
+        x = (x << 16) | f[i]
+    return x % ed.q
+
+@micropython.viper
+def fe_mul(r, a, b):
+    """r = a * b; r may alias a or b"""
+    rp = ptr32(r)
+    ap = ptr32(a)
+    bp = ptr32(b)
+    t = ptr32(_T)
+
+    for i in range(32):
+        t[i] = 0
+    # Column sums stay below 2^21: at most 32 terms below 2^16 each
+    for i in range(16):
+        ai = uint(ap[i])
+        for j in range(16):
+            p = ai * uint(bp[j])
+            t[i + j] = uint(t[i + j]) + (p & 0xffff)
+            t[i + j + 1] = uint(t[i + j + 1]) + (p >> 16)
+
+    # Fold limbs 16..31 down with 2^256 = 38, then carry; three passes are
+    # always enough to leave every limb below 2^16
+    for i in range(16):
+        t[i] = uint(t[i]) + 38 * uint(t[i + 16])
+    for _ in range(3):
+        c = uint(0)
+        for i in range(16):
+            c = c + uint(t[i])
+            t[i] = c & 0xffff
+            c = c >> 16
+        t[0] = uint(t[0]) + 38 * c
+
+    for i in range(16):
+        rp[i] = t[i]
+
+def fe_sq(r, a):
+    fe_mul(r, a, a)
+
+@micropython.viper
+def fe_add(r, a, b):
+    """r = a + b"""
+    rp = ptr32(r)
+    ap = ptr32(a)
+    bp = ptr32(b)
+
+    c = 0
+    for i in range(16):
+        c = c + int(ap[i]) + int(bp[i])
+        rp[i] = c & 0xffff
+        c = c >> 16
+    for _ in range(2):
+        c = c * 38
+        for i in range(16):
+            c = c + int(rp[i])
+            rp[i] = c & 0xffff
+            c = c >> 16
+
+@micropython.viper
+def fe_sub(r, a, b):
+    """r = a - b, with signed carries folded back through 2^256 = 38"""
+    rp = ptr32(r)
+    ap = ptr32(a)
+    bp = ptr32(b)
+
+    c = 0
+    for i in range(16):
+        c = c + int(ap[i]) - int(bp[i])
+        rp[i] = c & 0xffff
+        c = c >> 16
+    for _ in range(3):
+        c = c * 38
+        for i in range(16):
+            c = c + int(rp[i])
+            rp[i] = c & 0xffff
+            c = c >> 16
+
+@micropython.viper
+def fe_cmov(r, a, flag: int):
+    """r = a if flag is 1, r unchanged if 0, without branching on flag"""
+    rp = ptr32(r)
+    ap = ptr32(a)
+    m = uint(0) - uint(flag)
+    for i in range(16):
+        x = uint(rp[i])
+        rp[i] = x ^ (m & (x ^ uint(ap[i])))
+
+@micropython.viper
+def fe_cswap(a, b, flag: int):
+    """Swap a and b if flag is 1, without branching on flag"""
+    ap = ptr32(a)
+    bp = ptr32(b)
+    m = uint(0) - uint(flag)
+    for i in range(16):
+        x = uint(ap[i])
+        y = uint(bp[i])
+        t = m & (x ^ y)
+        ap[i] = x ^ t
+        bp[i] = y ^ t
+
+# Extended points are lists of four limb arrays [X, Y, Z, T]; niels
+# entries are lists of three [y+x, y-x, 2*d*x*y].
+_D2 = fe_from_int(ed.d2)
+_A = fe_new()
+_B = fe_new()
+_C = fe_new()
+_D = fe_new()
+_E = fe_new()
+_F = fe_new()
+_G = fe_new()
+_H = fe_new()
+_ZERO = fe_new()
+_ONE = fe_from_int(1)
+
+def ge_new():
+    return [fe_new(), fe_new(), fe_new(), fe_new()]
+
+def ge_from_point(P, R=None):
+    if R is None:
+        R = ge_new()
+    for i in range(4):
+        fe_from_int(P[i], R[i])
+    return R
+
+def ge_to_point(R):
+    return (fe_to_int(R[0]), fe_to_int(R[1]), fe_to_int(R[2]), fe_to_int(R[3]))
+
+def _finish(R):
+    fe_mul(R[0], _E, _F)
+    fe_mul(R[1], _G, _H)
+    fe_mul(R[2], _F, _G)
+    fe_mul(R[3], _E, _H)
+
+def ge_add(R, P, Q):
+    """R = P + Q; R may alias P or Q"""
+    X1, Y1, Z1, T1 = P
+    X2, Y2, Z2, T2 = Q
+
+    fe_sub(_A, Y1, X1)
+    fe_sub(_H, Y2, X2)
+    fe_mul(_A, _A, _H)
+    fe_add(_B, Y1, X1)
+    fe_add(_H, Y2, X2)
+    fe_mul(_B, _B, _H)
+    fe_mul(_C, T1, T2)
+    fe_mul(_C, _C, _D2)
+    fe_mul(_D, Z1, Z2)
+    fe_add(_D, _D, _D)
+    fe_sub(_E, _B, _A)
+    fe_sub(_F, _D, _C)
+    fe_add(_G, _D, _C)
+    fe_add(_H, _B, _A)
+    _finish(R)
+
+def ge_add_niels(R, P, n, neg=False):
+    """R = P + n (or P - n); n is an affine niels entry"""
+    X1, Y1, Z1, T1 = P
+    ypx, ymx, xy2d = n
+    if neg:
+        ypx, ymx = ymx, ypx
+
+    fe_sub(_A, Y1, X1)
+    fe_mul(_A, _A, ymx)
+    fe_add(_B, Y1, X1)
+    fe_mul(_B, _B, ypx)
+    fe_mul(_C, T1, xy2d)
+    fe_add(_D, Z1, Z1)
+    fe_sub(_E, _B, _A)
+    fe_add(_H, _B, _A)
+    if neg:
+        fe_add(_F, _D, _C)
+        fe_sub(_G, _D, _C)
+    else:
+        fe_sub(_F, _D, _C)
+        fe_add(_G, _D, _C)
+    _finish(R)
+
+def ge_double(R, P):
+    """R = 2P; R may alias P"""
+    X1, Y1, Z1, _ = P
+
+    fe_sq(_A, X1)
+    fe_sq(_B, Y1)
+    fe_sq(_C, Z1)
+    fe_add(_C, _C, _C)
+    fe_add(_H, _A, _B)
+    fe_add(_E, X1, Y1)
+    fe_sq(_E, _E)
+    fe_sub(_E, _H, _E)
+    fe_sub(_G, _A, _B)
+    fe_add(_F, _C, _G)
+    _finish(R)
+
+def ge_cswap(P, Q, flag):
+    for i in range(4):
+        fe_cswap(P[i], Q[i], flag)
+
+def ge_neg(R, P):
+    fe_sub(R[0], _ZERO, P[0])
+    R[1][:] = P[1]
+    R[2][:] = P[2]
+    fe_sub(R[3], _ZERO, P[3])
+
+def _niels(entry):
+    return [fe_from_int(v) for v in entry]
+
+# Limb copies of the int tables in ed25519_pico, converted on first use
+_base_table = None
+_base_table_src = None
+_base_odd = None
+
+def scalarmult(P, e):
+    """Same contract as ed25519_pico.scalarmult"""
+    Q = ge_from_point(ed.IDENTITY)
+    addend = ge_from_point(P)
+    while e:
+        if e & 1:
+            ge_add(Q, Q, addend)
+        ge_double(addend, addend)
+        e >>= 1
+    return ge_to_point(Q)
+
+def _limb_base_table():
+    global _base_table, _base_table_src
+    table = ed.base_table()
+    if _base_table_src is not table:
+        _base_table = [[_niels(entry) for entry in row] for row in table]
+        _base_table_src = table
+    return _base_table
+
+def scalarmult_base(e):
+    """Same contract as ed25519_pico.scalarmult_base"""
+    Q = ge_from_point(ed.IDENTITY)
+    for row, digit in zip(_limb_base_table(), ed.base_digits(e)):
+        if digit > 0:
+            ge_add_niels(Q, Q, row[digit - 1])
+        elif digit < 0:
+            ge_add_niels(Q, Q, row[-digit - 1], True)
+    return ge_to_point(Q)
+
+def scalarmult_base_ct(e):
+    """Same contract as ed25519_pico.scalarmult_base_ct"""
+    n = [fe_new(), fe_new(), fe_new()]
+    neg_xy2d = fe_new()
+    Q = ge_from_point(ed.IDENTITY)
+    for row, digit in zip(_limb_base_table(), ed.base_digits(e)):
+        neg = (digit >> 8) & 1
+        absd = (digit ^ -neg) + neg
+
+        # Identity niels (1, 1, 0), replaced by the matching entry
+        n[0][:] = _ONE
+        n[1][:] = _ONE
+        n[2][:] = _ZERO
+        for j in range(len(row)):
+            m = int(j + 1 == absd)
+            fe_cmov(n[0], row[j][0], m)
+            fe_cmov(n[1], row[j][1], m)
+            fe_cmov(n[2], row[j][2], m)
+
+        fe_cswap(n[0], n[1], neg)
+        fe_sub(neg_xy2d, _ZERO, n[2])
+        fe_cmov(n[2], neg_xy2d, neg)
+        ge_add_niels(Q, Q, n)
+    return ge_to_point(Q)
+
+def scalarmult_ladder(P, e):
+    """Same contract as ed25519_pico.scalarmult_ladder"""
+    R0 = ge_from_point(ed.IDENTITY)
+    R1 = ge_from_point(P)
+    for i in range(254, -1, -1):
+        bit = (e >> i) & 1
+        ge_cswap(R0, R1, bit)
+        ge_add(R1, R0, R1)
+        ge_double(R0, R0)
+        ge_cswap(R0, R1, bit)
+    return ge_to_point(R0)
+
+def double_scalarmult(a, b, P):
+    """Same contract as ed25519_pico.double_scalarmult"""
+    global _base_odd
+    if _base_odd is None:
+        _base_odd = [_niels(entry) for entry in ed.base_odd_multiples()]
+
+    # Odd multiples of P and their negations
+    P = ge_from_point(P)
+    P2 = ge_new()
+    ge_double(P2, P)
+    odd = [P]
+    for _ in range((1 << (ed.NAF_WINDOW_P - 2)) - 1):
+        Q = ge_new()
+        ge_add(Q, odd[-1], P2)
+        odd.append(Q)
+    neg = []
+    for Q in odd:
+        N = ge_new()
+        ge_neg(N, Q)
+        neg.append(N)
+
+    na = ed.wnaf(a, ed.NAF_WINDOW_B)
+    nb = ed.wnaf(b, ed.NAF_WINDOW_P)
+    Q = ge_from_point(ed.IDENTITY)
+    for i in range(max(len(na), len(nb)) - 1, -1, -1):
+        ge_double(Q, Q)
+        if i < len(na):
+            digit = na[i]
+            if digit > 0:
+                ge_add_niels(Q, Q, _base_odd[digit >> 1])
+            elif digit < 0:
+                ge_add_niels(Q, Q, _base_odd[-digit >> 1], True)
+        if i < len(nb):
+            digit = nb[i]
+            if digit > 0:
+                ge_add(Q, Q, odd[digit >> 1])
+            elif digit < 0:
+                ge_add(Q, Q, neg[-digit >> 1])
+    return ge_to_point(Q)
@@ -0,0 +1,155 @@
+# frame.py
+# Binary framing for the serial link between the laptop and the Pico.
+# The same file is used on both sides (laptop/frame.py is a copy), so keep
+# it plain Python that runs under CPython and MicroPython.
+#
+# Frame layout, big-endian:
+#   A5 5A | request id (2) | kind (1) | length (2) | payload | CRC-16 (2)
+# The CRC (CCITT-FALSE) covers request id, kind, length and payload.
+# Requests carry a command code as kind, replies echo the request id with
+# one of the status kinds below.
+
+import struct
+
+SYNC = b"\xa5\x5a"
+MAX_PAYLOAD = 4096
+
+# Commands
+PING = 0x01
+GETNAME = 0x02
+GETPUBLICKEY = 0x03
+CREATEWALLET = 0x04
+DELETEWALLET = 0x05
+GETPRIVATEKEY = 0x06
+UNLOCK = 0x07
+LOCK = 0x08
+SIGNTX = 0x09
+LISTACCOUNTS = 0x0a  # payload: first account (4) or nothing
+SIGNWITH = 0x0b      # fields: password, account (4), message
+STOP = 0x7f
+
+# Reply kinds
+OK = 0x80
+ERROR = 0x81      # payload is an ASCII reason such as b"wrongpass"
+PROGRESS = 0x82   # unsolicited status text while a command runs
+
+class FrameError(ValueError):
+    pass
+
+def _crc_table():
+    table = []
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1) & 0xffff
+        table.append(crc)
+    return table
+
+_CRC_TABLE = _crc_table()
+
+def crc16(data, crc=0xffff):
+    for b in data:
+        crc = ((crc << 8) & 0xffff) ^ _CRC_TABLE[(crc >> 8) ^ b]
+    return crc
+
+def encode(req_id, kind, payload=b""):
+    if len(payload) > MAX_PAYLOAD:
+        raise FrameError("payload too large")
+    header = struct.pack(">HBH", req_id, kind, len(payload))
+    crc = crc16(payload, crc16(header))
+    return SYNC + header + payload + struct.pack(">H", crc)
+
+def read_frame(read):
+    """Read one frame with read(n), returns (req_id, kind, payload)
+
+    Bytes before the sync marker are skipped. Returns None if read()
+    comes back short (timeout or EOF) and raises FrameError on a bad
+    length or CRC.
+    """
+    b = read(1)
+    while True:
+        if not b:
+            return None
+        if b[0] == SYNC[0]:
+            b = read(1)
+            if b and b[0] == SYNC[1]:
+                break
+            continue
+        b = read(1)
+
+    header = read(5)
+    if len(header) < 5:
+        return None
+    req_id, kind, length = struct.unpack(">HBH", header)
+    if length > MAX_PAYLOAD:
+        raise FrameError("payload too large")
+    body = read(length + 2)
+    if len(body) < length + 2:
+        return None
+    payload = body[:length]
+    if crc16(payload, crc16(header)) != struct.unpack(">H", body[length:])[0]:
+        raise FrameError("bad crc")
+    return req_id, kind, payload
+
+class FrameParser:
+    """Incremental parser for event loops: feed() bytes, get whole frames
+
+    Garbage and frames with a bad CRC are skipped by resynchronising on
+    the next sync marker.
+    """
+
+    def __init__(self):
+        self.buf = b""
+        self.errors = 0
+
+    def feed(self, data):
+        self.buf += data
+        frames = []
+        while True:
+            start = self.buf.find(SYNC)
+            if start < 0:
+                # keep a trailing first sync byte, it may be completed later
+                self.buf = self.buf[-1:] if self.buf[-1:] == SYNC[:1] else b""
+                return frames
+            self.buf = self.buf[start:]
+            if len(self.buf) < 7:
+                return frames
+            header = self.buf[2:7]
+            req_id, kind, length = struct.unpack(">HBH", header)
+            if length > MAX_PAYLOAD:
+                self.errors += 1
+                self.buf = self.buf[1:]
+                continue
+            if len(self.buf) < 9 + length:
+                return frames
+            payload = self.buf[7:7 + length]
+            crc = struct.unpack(">H", self.buf[7 + length:9 + length])[0]
+            if crc16(payload, crc16(header)) != crc:
+                self.errors += 1
+                self.buf = self.buf[1:]
+                continue
+            self.buf = self.buf[9 + length:]
+            frames.append((req_id, kind, payload))
+
+def pack_fields(*fields):
+    """Several byte strings in one payload, each prefixed by a 2-byte length"""
+    out = b""
+    for f in fields:
+        if isinstance(f, str):
+            f = f.encode()
+        out += struct.pack(">H", len(f)) + f
+    return out
+
+def unpack_fields(payload):
+    fields = []
+    pos = 0
+    while pos < len(payload):
+        if pos + 2 > len(payload):
+            raise FrameError("truncated field")
+        n = struct.unpack(">H", payload[pos:pos + 2])[0]
+        pos += 2
+        if pos + n > len(payload):
+            raise FrameError("truncated field")
+        fields.append(payload[pos:pos + n])
+        pos += n
+    return fields
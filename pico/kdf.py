@@ -0,0 +1,94 @@
+# kdf.py
+# Password key derivation for the wallet: PBKDF2-HMAC-SHA256 with a
+# per-wallet salt, plus the HMAC it is built on.
+#
+# scrypt would be the memory-hard choice, but a useful scrypt cost does
+# not fit next to everything else in the Pico's heap, so the work factor
+# is PBKDF2 iterations, calibrated on the device to a target unlock time.
+# Under CPython hashlib.pbkdf2_hmac gives the same result.
+
+import struct
+try:
+    import uhashlib
+except ImportError:
+    import hashlib as uhashlib
+
+try:
+    from hashlib import pbkdf2_hmac as _native_pbkdf2
+except ImportError:
+    _native_pbkdf2 = None
+
+try:
+    from utime import ticks_ms as _ticks, ticks_diff as _diff
+except ImportError:
+    import time
+    _ticks = lambda: int(time.perf_counter() * 1000)
+    _diff = lambda a, b: a - b
+
+SALT_SIZE = 16
+# Never go below this, however slow the calibration run was
+MIN_ITERATIONS = 1000
+# Unlock time the iteration count is calibrated for
+TARGET_MS = 1000
+
+def _pads(key):
+    if len(key) > 64:
+        key = uhashlib.sha256(key).digest()
+    key = key + bytes(64 - len(key))
+    return bytes(b ^ 0x36 for b in key), bytes(b ^ 0x5c for b in key)
+
+def _hmac(ipad, opad, msg):
+    h = uhashlib.sha256(ipad)
+    h.update(msg)
+    inner = h.digest()
+    h = uhashlib.sha256(opad)
+    h.update(inner)
+    return h.digest()
+
+def hmac_sha256(key, msg):
+    ipad, opad = _pads(key)
+    return _hmac(ipad, opad, msg)
+
+def equal(a, b):
+    """Compare without an early exit"""
+    if len(a) != len(b):
+        return False
+    diff = 0
+    for i in range(len(a)):
+        diff |= a[i] ^ b[i]
+    return diff == 0
+
+def pbkdf2_hmac_sha256(password, salt, iterations, dklen=32):
+    if isinstance(password, str):
+        password = password.encode()
+    if _native_pbkdf2 is not None:
+        return _native_pbkdf2("sha256", password, salt, iterations, dklen)
+
+    # The pads are hashed fresh every round (uhashlib objects cannot be
+    # copied); the running XOR is kept as one int
+    ipad, opad = _pads(password)
+    out = b""
+    block = 1
+    while len(out) < dklen:
+        u = _hmac(ipad, opad, salt + struct.pack(">I", block))
+        acc = int.from_bytes(u, "big")
+        for _ in range(iterations - 1):
+            u = _hmac(ipad, opad, u)
+            acc ^= int.from_bytes(u, "big")
+        out += acc.to_bytes(32, "big")
+        block += 1
+    return out[:dklen]
+
+def iterations_per_second(sample=256):
+    # Double the run until it is long enough for a millisecond clock
+    while True:
+        start = _ticks()
+        pbkdf2_hmac_sha256(b"calibrate", bytes(SALT_SIZE), sample)
+        elapsed = _diff(_ticks(), start)
+        if elapsed >= 100:
+            return sample * 1000 // elapsed
+        sample *= 2
+
+def calibrate(target_ms=TARGET_MS, sample=256):
+    """Iteration count that takes about target_ms on this machine"""
+    return max(MIN_ITERATIONS, iterations_per_second(sample) * target_ms // 1000)
@@ -1,96 +1,296 @@
 import sys
-import os
-import uhashlib
-import ujson as json
+import struct
+import _thread
 from wallet import *
-import utime
+import walletfile
+import frame
+import ed25519_pico
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
 
 WALLET_FILE="wallet.dat"
-run=True
-def commands(line):
-    if line=="stoptzl":
+_write=None
+# Replies can come from the event loop and from the worker thread at once
+_write_lock=_thread.allocate_lock()
+# Held while the worker thread runs a command; others queue up behind it.
+# Made by serve(), as an asyncio Lock belongs to the loop it is first used on
+_worker_lock=None
+# The worker thread is started once and kept: on the RP2040 it owns core1,
+# and starting a new thread before the last one has fully exited fails
+# with "core1 in use". _job holds the command handed to it and
+# _job_ready is released to wake it up.
+_job=None
+_job_ready=_thread.allocate_lock()
+_job_ready.acquire()
+_worker_started=False
+
+# Commands that can take long enough to stall the loop, and the ones that
+# change the key state under them; they run on the worker thread (the
+# second core on the RP2040), one at a time. Anything that checks a
+# password belongs here: without an unlocked session that is a PBKDF2
+# run of about a second. So does anything that reads accounts.dat or the
+# account state in wallet.py: the worker writes both, and the rp2 port
+# has no GIL to keep the two cores apart.
+SLOW_COMMANDS=(frame.CREATEWALLET,frame.UNLOCK,frame.SIGNTX,frame.LOCK,frame.DELETEWALLET,
+    frame.SIGNWITH,frame.GETPRIVATEKEY,frame.LISTACCOUNTS)
+
+# Accounts per LISTACCOUNTS reply, each is account (4) + public key (32)
+ACCOUNTS_PER_REPLY=frame.MAX_PAYLOAD//36
+
+def reply(req_id,kind,payload=b""):
+    data=frame.encode(req_id,kind,payload)
+    with _write_lock:
+        _write(data)
+
+def has_wallet():
+    return load_record() is not None
+
+def wallet_error():
+    """ERROR reason for a command that needs the wallet when there is none"""
+    return b"badwallet" if wallet_corrupt() else b"nowallet"
+
+def account_number(data):
+    """The 4-byte account number in a payload, -1 if it is malformed"""
+    if len(data)!=4:
+        return -1
+    return struct.unpack(">I",data)[0]
+
+def is_slow(cmd,payload):
+    if cmd in SLOW_COMMANDS:
+        return True
+    # An account's public key comes from the index or is derived
+    return cmd==frame.GETPUBLICKEY and len(payload)>0
+
+def commands(req_id,cmd,payload):
+    if cmd==frame.STOP:
+        reply(req_id,frame.OK)
         return False
     
-    elif line=="ping":
-        sys.stdout.write("pong\n")
+    elif cmd==frame.PING:
+        reply(req_id,frame.OK,b"pong")
         return True
     
-    elif line=="getname":
-        sys.stdout.write(f"{get_name()}\n")
+    elif cmd==frame.GETNAME:
+        reply(req_id,frame.OK,str(get_name()).encode())
         return True
     
-    elif line.startswith("getprivatekey"):
-        data=read_file()
-        if not data or data=="None" or data==None:
-            sys.stdout.write("nowallet\n")
-            data=""
-            return True
-        data=json.loads(data)
-        password=line.split(":")[1]
-        if hash(password)==data["passhash"]:
-            sys.stdout.write(f"{data["privatekey"]}\n")
-            data=""
-            password=""
+    elif cmd==frame.GETPRIVATEKEY:
+        if not has_wallet():
+            reply(req_id,frame.ERROR,wallet_error())
             return True
+        password=payload.decode()
+        opened=check_password(password)
+        if opened is not None:
+            # The whole record: the laptop derives the key and opens the
+            # seed itself
+            reply(req_id,frame.OK,walletfile.dump(opened[0]))
         else:
-            sys.stdout.write("wrongpass\n")
-            data=""
-            password=""
-            return True
+            reply(req_id,frame.ERROR,b"wrongpass")
+        password=""
+        opened=None
+        return True
         
-    elif line.startswith("deletewallet"):
-        data=read_file()
-        if not data or data=="None" or data==None:
-            sys.stdout.write("nowallet\n")
-            data=""
+    elif cmd==frame.DELETEWALLET:
+        if not has_wallet() and not wallet_corrupt():
+            reply(req_id,frame.ERROR,wallet_error())
             return True
         
-        password=line.split(":")[1]
+        password=payload.decode()
         ans_del=delete_wallet(password)
         if ans_del==0:
-            sys.stdout.write("done\n")
-            data=""
-            password=""
+            reply(req_id,frame.OK,b"done")
+        else:
+            reply(req_id,frame.ERROR,b"wrongpass")
+        password=""
+        return True
+
+    elif cmd==frame.UNLOCK:
+        if not has_wallet():
+            reply(req_id,frame.ERROR,wallet_error())
             return True
+        password=payload.decode()
+        if get_signing_key(password) is None:
+            reply(req_id,frame.ERROR,b"wrongpass")
         else:
-            sys.stdout.write("wrongpass\n")
-            data=""
-            password=""
+            reply(req_id,frame.OK,b"unlocked")
+        password=""
+        return True
+
+    elif cmd==frame.LOCK:
+        lock_wallet()
+        reply(req_id,frame.OK,b"locked")
+        return True
+
+    elif cmd==frame.SIGNTX:
+        if not has_wallet():
+            reply(req_id,frame.ERROR,wallet_error())
             return True
+        password,message=frame.unpack_fields(payload)
+        signature=sign_transaction(password.decode(),message)
+        if signature is None:
+            reply(req_id,frame.ERROR,b"wrongpass")
+        else:
+            reply(req_id,frame.OK,signature)
+        password=""
+        message=""
+        return True
     
-    elif line.startswith("createwallet"):
-        usrdata=(line.split(":")[1],line.split(":")[2],line.split(":")[3])
-        ans_make=create_wallet(usrdata[0],usrdata[1],usrdata[2])
-        if ans_make=="walletexist":
-            sys.stdout.write("walletexist\n")
-            usrdata=""
+    elif cmd==frame.CREATEWALLET:
+        usrdata=[f.decode() for f in frame.unpack_fields(payload)]
+        progress=lambda text: reply(req_id,frame.PROGRESS,text.encode())
+        ans_make=create_wallet(usrdata[0],usrdata[1],usrdata[2],progress)
+        if ans_make=="created":
+            reply(req_id,frame.OK,b"created")
+        elif ans_make=="walletexist":
+            reply(req_id,frame.ERROR,b"walletexist")
+        elif ans_make=="nametoolong":
+            reply(req_id,frame.ERROR,b"nametoolong")
+        else:
+            reply(req_id,frame.ERROR,b"password_mismatch")
+        usrdata=""
+        return True
+
+    elif cmd==frame.GETPUBLICKEY:
+        if not has_wallet():
+            reply(req_id,frame.ERROR,wallet_error())
             return True
-        elif ans_make=="created":
-            sys.stdout.write("created\n")
-            usrdata=""
+        if not payload:
+            reply(req_id,frame.OK,get_public_key())
             return True
+        publickey=get_account_public_key(account_number(payload))
+        if publickey is None:
+            reply(req_id,frame.ERROR,b"locked")
+        elif publickey=="badaccount":
+            reply(req_id,frame.ERROR,b"badaccount")
+        else:
+            reply(req_id,frame.OK,publickey)
+        return True
 
-    elif line=="getpublickey":
-        data=read_file()
-        if not data or data=="None" or data==None:
-            sys.stdout.write("nowallet\n")
-            data=""
+    elif cmd==frame.LISTACCOUNTS:
+        if not has_wallet():
+            reply(req_id,frame.ERROR,wallet_error())
             return True
-        else:
-            data=json.loads(data)
-            pub=data["publickey"]
-            sys.stdout.write(f"{pub}\n")
-            data=""
-            pub=""
+        start=account_number(payload) if payload else 0
+        if start<0:
+            reply(req_id,frame.ERROR,b"badaccount")
             return True
-    else:
-        sys.stdout.write("unknown\n")
+        accounts=list_accounts(start,ACCOUNTS_PER_REPLY)
+        if accounts is None:
+            reply(req_id,frame.ERROR,b"locked")
+            return True
+        reply(req_id,frame.OK,b"".join(struct.pack(">I",n)+key for n,key in accounts))
         return True
 
-while run==True:
-    line=sys.stdin.readline().strip()
-    if line:
-        run=commands(line)
+    elif cmd==frame.SIGNWITH:
+        if not has_wallet():
+            reply(req_id,frame.ERROR,wallet_error())
+            return True
+        password,account,message=frame.unpack_fields(payload)
+        signature=sign_with_account(password.decode(),account_number(account),message)
+        if signature is None:
+            reply(req_id,frame.ERROR,b"wrongpass")
+        elif signature=="badaccount":
+            reply(req_id,frame.ERROR,b"badaccount")
+        else:
+            reply(req_id,frame.OK,signature)
+        password=""
+        message=""
+        return True
     else:
+        reply(req_id,frame.ERROR,b"unknown")
+        return True
+
+def sleep_ms(ms):
+    if hasattr(asyncio,"sleep_ms"):
+        return asyncio.sleep_ms(ms)
+    return asyncio.sleep(ms/1000)
+
+def run_command(req_id,cmd,payload):
+    """commands(), with an exception turned into an ERROR reply"""
+    try:
+        return commands(req_id,cmd,payload)
+    except Exception as e:
+        reply(req_id,frame.ERROR,str(e).encode())
+        return True
+
+def worker():
+    while True:
+        _job_ready.acquire()
+        req_id,cmd,payload,done=_job
+        run_command(req_id,cmd,payload)
+        done.append(True)
+
+async def run_slow(req_id,cmd,payload):
+    """Run a slow command on the worker thread and wait for it"""
+    global _job,_worker_started
+    done=[]
+    async with _worker_lock:
+        if not _worker_started:
+            _thread.start_new_thread(worker,())
+            _worker_started=True
+        _job=(req_id,cmd,payload,done)
+        _job_ready.release()
+        while not done:
+            await sleep_ms(5)
+
+class StdinReader:
+    """Reads stdin inside the event loop without blocking it
+
+    Waits for the first byte through uasyncio's stream reader, which
+    parks the task on the scheduler's uselect.poll, then drains whatever
+    else is already buffered with a zero-timeout poll.
+    """
+
+    def __init__(self,stream):
+        import uselect
+        self.stream=stream
+        self.reader=asyncio.StreamReader(stream)
+        self.poller=uselect.poll()
+        self.poller.register(stream,uselect.POLLIN)
+
+    async def read(self,n):
+        data=await self.reader.read(1)
+        while len(data)<n and self.poller.poll(0):
+            data+=self.stream.read(1)
+        return data
+
+async def serve(reader,write):
+    """Answer framed commands from reader until STOP or end of input"""
+    global _write,_worker_lock
+    _write=write
+    _worker_lock=asyncio.Lock()
+    parser=frame.FrameParser()
+    while True:
+        data=await reader.read(256)
+        if not data:
+            return
+        for req_id,cmd,payload in parser.feed(data):
+            if is_slow(cmd,payload):
+                asyncio.create_task(run_slow(req_id,cmd,payload))
+            elif not run_command(req_id,cmd,payload):
+                return
+
+if __name__=="__main__":
+    # Payloads are raw bytes, so Ctrl-C (0x03) must not interrupt us
+    import micropython
+    micropython.kbd_intr(-1)
+    try:
+        _thread.stack_size(16*1024)
+    except Exception:
         pass
-    utime.sleep(0.05)
+    # Scalar multiplication on fe25519 limbs instead of bigints, unless
+    # this build cannot load it
+    ed25519_pico.select_engine()
+    # A write cut short by power loss leaves wallet.dat as it was and the
+    # new copy in wallet.dat.tmp; drop it
+    walletfile.clean(WALLET_FILE)
+    # Parse wallet.dat once at boot, commands answer from RAM after this.
+    # An unreadable file is not fatal: commands answer "badwallet" and
+    # DELETEWALLET or CREATEWALLET replaces it.
+    load_record()
+    try:
+        asyncio.run(serve(StdinReader(sys.stdin.buffer),sys.stdout.buffer.write))
+    finally:
+        micropython.kbd_intr(3)
@@ -1,138 +1,247 @@
 import struct
 
+MASK = 0xffffffffffffffff
+
+K = [
+    0x428a2f98d728ae22, 0x7137449123ef65cd,
+    0xb5c0fbcfec4d3b2f, 0xe9b5dba58189dbbc,
+    0x3956c25bf348b538, 0x59f111f1b605d019,
+    0x923f82a4af194f9b, 0xab1c5ed5da6d8118,
+    0xd807aa98a3030242, 0x12835b0145706fbe,
+    0x243185be4ee4b28c, 0x550c7dc3d5ffb4e2,
+    0x72be5d74f27b896f, 0x80deb1fe3b1696b1,
+    0x9bdc06a725c71235, 0xc19bf174cf692694,
+    0xe49b69c19ef14ad2, 0xefbe4786384f25e3,
+    0x0fc19dc68b8cd5b5, 0x240ca1cc77ac9c65,
+    0x2de92c6f592b0275, 0x4a7484aa6ea6e483,
+    0x5cb0a9dcbd41fbd4, 0x76f988da831153b5,
+    0x983e5152ee66dfab, 0xa831c66d2db43210,
+    0xb00327c898fb213f, 0xbf597fc7beef0ee4,
+    0xc6e00bf33da88fc2, 0xd5a79147930aa725,
+    0x06ca6351e003826f, 0x142929670a0e6e70,
+    0x27b70a8546d22ffc, 0x2e1b21385c26c926,
+    0x4d2c6dfc5ac42aed, 0x53380d139d95b3df,
+    0x650a73548baf63de, 0x766a0abb3c77b2a8,
+    0x81c2c92e47edaee6, 0x92722c851482353b,
+    0xa2bfe8a14cf10364, 0xa81a664bbc423001,
+    0xc24b8b70d0f89791, 0xc76c51a30654be30,
+    0xd192e819d6ef5218, 0xd69906245565a910,
+    0xf40e35855771202a, 0x106aa07032bbd1b8,
+    0x19a4c116b8d2d0c8, 0x1e376c085141ab53,
+    0x2748774cdf8eeb99, 0x34b0bcb5e19b48a8,
+    0x391c0cb3c5c95a63, 0x4ed8aa4ae3418acb,
+    0x5b9cca4f7763e373, 0x682e6ff3d6b2b8a3,
+    0x748f82ee5defb2fc, 0x78a5636f43172f60,
+    0x84c87814a1f0ab72, 0x8cc702081a6439ec,
+    0x90befffa23631e28, 0xa4506cebde82bde9,
+    0xbef9a3f7b2c67915, 0xc67178f2e372532b,
+    0xca273eceea26619c, 0xd186b8c721c0c207,
+    0xeada7dd6cde0eb1e, 0xf57d4f7fee6ed178,
+    0x06f067aa72176fba, 0x0a637dc5a2c898a6,
+    0x113f9804bef90dae, 0x1b710b35131c471b,
+    0x28db77f523047d84, 0x32caab7b40c72493,
+    0x3c9ebe0a15c9bebc, 0x431d67c49c100d4c,
+    0x4cc5d4becb3e42b6, (0x597f299cfc657e2a),
+    (0x5fcb6fab3ad6faec), (0x6c44198c4a475817)
+]
+
+H0 = (
+    0x6a09e667f3bcc908, 0xbb67ae8584caa73b,
+    0x3c6ef372fe94f82b, 0xa54ff53a5f1d36f1,
+    0x510e527fade682d1, 0x9b05688c2b3e6c1f,
+    0x1f83d9abfb41bd6b, 0x5be0cd19137e2179,
+)
+
 def _rotr(x, n):
-    return ((x >> n) | (x << (64 - n))) & 0xffffffffffffffff
+    return ((x >> n) | (x << (64 - n))) & MASK
+
+def _sha512_compress(block, offset, h, w):
+    """Compress one 128-byte block at block[offset:] into h, in place
 
-def _sha512_compress(chunk, h):
-    w = [0] * 80
-    w[0:16] = struct.unpack(">16Q", chunk)
+    w is a caller-owned 80-entry schedule list that gets overwritten.
+    """
+    w[0:16] = struct.unpack_from(">16Q", block, offset)
 
     for i in range(16, 80):
         s0 = _rotr(w[i - 15], 1) ^ _rotr(w[i - 15], 8) ^ (w[i - 15] >> 7)
         s1 = _rotr(w[i - 2], 19) ^ _rotr(w[i - 2], 61) ^ (w[i - 2] >> 6)
-        w[i] = (w[i - 16] + s0 + w[i - 7] + s1) & 0xffffffffffffffff
+        w[i] = (w[i - 16] + s0 + w[i - 7] + s1) & MASK
 
     a, b, c, d, e, f, g, hh = h
 
-    K = [
-        0x428a2f98d728ae22, 0x7137449123ef65cd,
-        0xb5c0fbcfec4d3b2f, 0xe9b5dba58189dbbc,
-        0x3956c25bf348b538, 0x59f111f1b605d019,
-        0x923f82a4af194f9b, 0xab1c5ed5da6d8118,
-        0xd807aa98a3030242, 0x12835b0145706fbe,
-        0x243185be4ee4b28c, 0x550c7dc3d5ffb4e2,
-        0x72be5d74f27b896f, 0x80deb1fe3b1696b1,
-        0x9bdc06a725c71235, 0xc19bf174cf692694,
-        0xe49b69c19ef14ad2, 0xefbe4786384f25e3,
-        0x0fc19dc68b8cd5b5, 0x240ca1cc77ac9c65,
-        0x2de92c6f592b0275, 0x4a7484aa6ea6e483,
-        0x5cb0a9dcbd41fbd4, 0x76f988da831153b5,
-        0x983e5152ee66dfab, 0xa831c66d2db43210,
-        0xb00327c898fb213f, 0xbf597fc7beef0ee4,
-        0xc6e00bf33da88fc2, 0xd5a79147930aa725,
-        0x06ca6351e003826f, 0x142929670a0e6e70,
-        0x27b70a8546d22ffc, 0x2e1b21385c26c926,
-        0x4d2c6dfc5ac42aed, 0x53380d139d95b3df,
-        0x650a73548baf63de, 0x766a0abb3c77b2a8,
-        0x81c2c92e47edaee6, 0x92722c851482353b,
-        0xa2bfe8a14cf10364, 0xa81a664bbc423001,
-        0xc24b8b70d0f89791, 0xc76c51a30654be30,
-        0xd192e819d6ef5218, 0xd69906245565a910,
-        0xf40e35855771202a, 0x106aa07032bbd1b8,
-        0x19a4c116b8d2d0c8, 0x1e376c085141ab53,
-        0x2748774cdf8eeb99, 0x34b0bcb5e19b48a8,
-        0x391c0cb3c5c95a63, 0x4ed8aa4ae3418acb,
-        0x5b9cca4f7763e373, 0x682e6ff3d6b2b8a3,
-        0x748f82ee5defb2fc, 0x78a5636f43172f60,
-        0x84c87814a1f0ab72, 0x8cc702081a6439ec,
-        0x90befffa23631e28, 0xa4506cebde82bde9,
-        0xbef9a3f7b2c67915, 0xc67178f2e372532b,
-        0xca273eceea26619c, 0xd186b8c721c0c207,
-        0xeada7dd6cde0eb1e, 0xf57d4f7fee6ed178,
-        0x06f067aa72176fba, 0x0a637dc5a2c898a6,
-        0x113f9804bef90dae, 0x1b710b35131c471b,
-        0x28db77f523047d84, 0x32caab7b40c72493,
-        0x3c9ebe0a15c9bebc, 0x431d67c49c100d4c,
-        0x4cc5d4becb3e42b6, (0x597f299cfc657e2a),
-        (0x5fcb6fab3ad6faec), (0x6c44198c4a475817)
-    ]
-
     for i in range(80):
         S1 = _rotr(e, 14) ^ _rotr(e, 18) ^ _rotr(e, 41)
         ch = (e & f) ^ ((~e) & g)
-        temp1 = (hh + S1 + ch + K[i] + w[i]) & 0xffffffffffffffff
+        temp1 = (hh + S1 + ch + K[i] + w[i]) & MASK
         S0 = _rotr(a, 28) ^ _rotr(a, 34) ^ _rotr(a, 39)
         maj = (a & b) ^ (a & c) ^ (b & c)
-        temp2 = (S0 + maj) & 0xffffffffffffffff
+        temp2 = (S0 + maj) & MASK
 
         hh = g
         g = f
         f = e
-        e = (d + temp1) & 0xffffffffffffffff
+        e = (d + temp1) & MASK
         d = c
         c = b
         b = a
-        a = (temp1 + temp2) & 0xffffffffffffffff
-
-    return [
-        (h[0] + a) & 0xffffffffffffffff,
-        (h[1] + b) & 0xffffffffffffffff,
-        (h[2] + c) & 0xffffffffffffffff,
-        (h[3] + d) & 0xffffffffffffffff,
-        (h[4] + e) & 0xffffffffffffffff,
-        (h[5] + f) & 0xffffffffffffffff,
-        (h[6] + g) & 0xffffffffffffffff,
-        (h[7] + hh) & 0xffffffffffffffff,
-    ]
+        a = (temp1 + temp2) & MASK
+
+    h[0] = (h[0] + a) & MASK
+    h[1] = (h[1] + b) & MASK
+    h[2] = (h[2] + c) & MASK
+    h[3] = (h[3] + d) & MASK
+    h[4] = (h[4] + e) & MASK
+    h[5] = (h[5] + f) & MASK
+    h[6] = (h[6] + g) & MASK
+    h[7] = (h[7] + hh) & MASK
 
 class sha512:
+    """Streaming SHA-512
+
+    Partial input sits in a fixed 128-byte block buffer; whole blocks are
+    compressed straight out of a memoryview of the input, so update() does
+    no per-block copying.
+    """
+    digest_size = 64
+    block_size = 128
+
     def __init__(self, data=b""):
-        self._buffer = b""
+        self._buffer = bytearray(128)
+        self._buflen = 0
         self._counter = 0
-        self._h = [
-            0x6a09e667f3bcc908, 0xbb67ae8584caa73b,
-            0x3c6ef372fe94f82b, 0xa54ff53a5f1d36f1,
-            0x510e527fade682d1, 0x9b05688c2b3e6c1f,
-            0x1f83d9abfb41bd6b, 0x5be0cd19137e2179,
-        ]
+        self._h = list(H0)
+        self._w = [0] * 80
         if data:
             self.update(data)
 
     def update(self, data):
-        self._buffer += data
-        self._counter += len(data)
-        while len(self._buffer) >= 128:
-            chunk = self._buffer[:128]
-            self._buffer = self._buffer[128:]
-            self._h = _sha512_compress(chunk, self._h)
+        mv = memoryview(data)
+        n = len(mv)
+        self._counter += n
+        pos = 0
+
+        # Top up a partially filled block first
+        if self._buflen:
+            pos = min(128 - self._buflen, n)
+            self._buffer[self._buflen:self._buflen + pos] = mv[:pos]
+            self._buflen += pos
+            if self._buflen < 128:
+                return
+            _sha512_compress(self._buffer, 0, self._h, self._w)
+            self._buflen = 0
+
+        while n - pos >= 128:
+            _sha512_compress(mv, pos, self._h, self._w)
+            pos += 128
+
+        if pos < n:
+            self._buflen = n - pos
+            self._buffer[:self._buflen] = mv[pos:]
+
+    def copy(self):
+        """Fork the hash state, e.g. to reuse a shared prefix"""
+        other = sha512()
+        other._buffer[:] = self._buffer
+        other._buflen = self._buflen
+        other._counter = self._counter
+        other._h = list(self._h)
+        return other
 
     def digest(self):
-        length = self._counter * 8
-
-    # Append the '1' bit
-        pad = b"\x80"
-
-    # Pad with zeros until message length ≡ 112 (mod 128)
-        pad_len = (112 - (self._counter + 1) % 128) % 128
-        pad += b"\x00" * pad_len
-
-    # Append 16-byte length (128-bit big-endian)
-        pad += struct.pack(">QQ", 0, length)
-
-        buf = self._buffer + pad
-
-    # Process each full 128-byte block
-        for i in range(0, len(buf), 128):
-            chunk = buf[i:i+128]
-            self._h = _sha512_compress(chunk, self._h)
-
-        out = b"".join(struct.pack(">Q", h) for h in self._h)
-        return out
-
+        # Pad on a scratch copy so the state can keep being updated
+        h = list(self._h)
+        buflen = self._buflen
+        end = 128 if buflen < 112 else 256
+        block = bytearray(end)
+        block[:buflen] = self._buffer[:buflen]
+
+        # Append the '1' bit, zeros, then the 128-bit big-endian bit length
+        block[buflen] = 0x80
+        struct.pack_into(">QQ", block, end - 16,
+                         self._counter >> 61, (self._counter << 3) & MASK)
+
+        for offset in range(0, end, 128):
+            _sha512_compress(block, offset, h, self._w)
+
+        return struct.pack(">8Q", *h)
+
+    def hexdigest(self):
+        return self.digest().hex()
+
+
+# Known-answer tests (FIPS 180-2 plus padding boundary lengths), used to
+# check a backend before it is trusted.
+KAT = (
+    (b"", "cf83e1357eefb8bdf1542850d66d8007d620e4050b5715dc83f4a921d36ce9ce"
+          "47d0d13c5d85f2b0ff8318d2877eec2f63b931bd47417a81a538327af927da3e"),
+    (b"abc", "ddaf35a193617abacc417349ae20413112e6fa4e89a97ea20a9eeee64b55d39a"
+             "2192992a274fc1a836ba3c23a3feebbd454d4423643ce80e2a9ac94fa54ca49f"),
+    (b"abcdefghbcdefghicdefghijdefghijkefghijklfghijklmghijklmnhijklmno"
+     b"ijklmnopjklmnopqklmnopqrlmnopqrsmnopqrstnopqrstu",
+     "8e959b75dae313da8cf4f72814fc143f8f7779c6eb9f7fa17299aeadb6889018"
+     "501d289e4900f7e4331b99dec4b5433ac7d329eeb6dd26545e96e55b874be909"),
+    (b"a" * 111, "fa9121c7b32b9e01733d034cfc78cbf67f926c7ed83e82200ef8681819692176"
+                 "0b4beff48404df811b953828274461673c68d04e297b0eb7b2b4d60fc6b566a2"),
+    (b"a" * 112, "c01d080efd492776a1c43bd23dd99d0a2e626d481e16782e75d54c2503b5dc32"
+                 "bd05f0f1ba33e568b88fd2d970929b719ecbb152f58f130a407c8830604b70ca"),
+    (b"a" * 239, "52c853cb8d907f3d4d6b889beb027985d7c273486d75f8baf26f80d24e90c74c"
+                 "6c3de3e22131582380a7d14d43f2941a31385439cd6ddc469f628015e50bf286"),
+)
+
+def self_test(factory):
+    """True if factory(data).digest() matches every KAT vector"""
+    try:
+        for msg, expected in KAT:
+            if factory(msg).digest().hex() != expected:
+                return False
+        return True
+    except Exception:
+        return False
+
+# Backend registry, fastest first. Each entry is (name, factory) where
+# factory(data) returns an object with digest(). The pure-Python class is
+# always last and is the guaranteed fallback.
+BACKENDS = []
+
+def register_backend(name, factory):
+    BACKENDS.append((name, factory))
+
+try:
+    import hashlib as _hashlib
+    if hasattr(_hashlib, "sha512"):
+        register_backend("hashlib", _hashlib.sha512)
+except ImportError:
+    pass
+
+try:
+    import uhashlib as _uhashlib
+    if hasattr(_uhashlib, "sha512"):
+        register_backend("uhashlib", _uhashlib.sha512)
+except ImportError:
+    pass
+
+try:
+    import sha512_viper as _viper
+    register_backend("viper", _viper.sha512)
+except ImportError:
+    pass
+
+register_backend("python", sha512)
+
+def select_backend():
+    """Pick the first registered backend that passes the KATs"""
+    global BACKEND, _factory
+    for name, factory in BACKENDS:
+        if factory is sha512 or self_test(factory):
+            BACKEND = name
+            _factory = factory
+            return name
+
+def check_backends():
+    """Run the KATs against every registered backend, {name: passed}"""
+    return dict((name, self_test(factory)) for name, factory in BACKENDS)
+
+select_backend()
 
 def sha512_digest(msg):
-    return sha512(msg).digest()
-
-# TEST
-#print(sha512_digest("hello".encode()).hex())
-
+    return _factory(msg).digest()
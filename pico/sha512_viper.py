@@ -0,0 +1,238 @@
+# sha512_viper.py
+# SHA-512 for MicroPython with the compression function compiled by the
+# viper emitter. Every 64-bit word is kept as two 32-bit halves (hi, lo)
+# in preallocated array('I') buffers, so the round loop works on machine
+# words and allocates nothing.
+# Only importable under MicroPython; sha512.py registers it as a backend.
+
+import micropython
+import struct
+from array import array
+
+# K and the initial state split into hi/lo halves, filled on first use
+_K = array('I', bytes(640))
+_H0 = array('I', bytes(64))
+_W = array('I', bytes(640))
+_ready = False
+
+def _init():
+    global _ready
+    import sha512 as ref
+    for i in range(80):
+        _K[2 * i] = ref.K[i] >> 32
+        _K[2 * i + 1] = ref.K[i] & 0xffffffff
+    for i in range(8):
+        _H0[2 * i] = ref.H0[i] >> 32
+        _H0[2 * i + 1] = ref.H0[i] & 0xffffffff
+    _ready = True
+
+# 64-bit additions are done on halves; the carry out of the low half is
+# ((x >> 1) + (y >> 1) + (x & y & 1)) >> 31, which needs no unsigned
+# comparison.
+@micropython.viper
+def _compress(state, block, offset: int):
+    h = ptr32(state)
+    w = ptr32(_W)
+    k = ptr32(_K)
+    p = ptr8(block)
+
+    for i in range(16):
+        j = offset + 8 * i
+        w[2 * i] = (uint(p[j]) << 24) | (uint(p[j + 1]) << 16) | (uint(p[j + 2]) << 8) | uint(p[j + 3])
+        w[2 * i + 1] = (uint(p[j + 4]) << 24) | (uint(p[j + 5]) << 16) | (uint(p[j + 6]) << 8) | uint(p[j + 7])
+
+    for i in range(16, 80):
+        # s0 = rotr(x, 1) ^ rotr(x, 8) ^ (x >> 7), x = w[i - 15]
+        xh = uint(w[2 * i - 30])
+        xl = uint(w[2 * i - 29])
+        s0h = ((xh >> 1) | (xl << 31)) ^ ((xh >> 8) | (xl << 24)) ^ (xh >> 7)
+        s0l = ((xl >> 1) | (xh << 31)) ^ ((xl >> 8) | (xh << 24)) ^ ((xl >> 7) | (xh << 25))
+
+        # s1 = rotr(x, 19) ^ rotr(x, 61) ^ (x >> 6), x = w[i - 2]
+        xh = uint(w[2 * i - 4])
+        xl = uint(w[2 * i - 3])
+        s1h = ((xh >> 19) | (xl << 13)) ^ ((xl >> 29) | (xh << 3)) ^ (xh >> 6)
+        s1l = ((xl >> 19) | (xh << 13)) ^ ((xh >> 29) | (xl << 3)) ^ ((xl >> 6) | (xh << 26))
+
+        # w[i] = w[i - 16] + s0 + w[i - 7] + s1
+        th = uint(w[2 * i - 32])
+        tl = uint(w[2 * i - 31])
+        lo = tl + s0l
+        th = th + s0h + (((tl >> 1) + (s0l >> 1) + (tl & s0l & 1)) >> 31)
+        tl = lo
+        xh = uint(w[2 * i - 14])
+        xl = uint(w[2 * i - 13])
+        lo = tl + xl
+        th = th + xh + (((tl >> 1) + (xl >> 1) + (tl & xl & 1)) >> 31)
+        tl = lo
+        lo = tl + s1l
+        th = th + s1h + (((tl >> 1) + (s1l >> 1) + (tl & s1l & 1)) >> 31)
+        w[2 * i] = th
+        w[2 * i + 1] = lo
+
+    ah = uint(h[0])
+    al = uint(h[1])
+    bh = uint(h[2])
+    bl = uint(h[3])
+    ch = uint(h[4])
+    cl = uint(h[5])
+    dh = uint(h[6])
+    dl = uint(h[7])
+    eh = uint(h[8])
+    el = uint(h[9])
+    fh = uint(h[10])
+    fl = uint(h[11])
+    gh = uint(h[12])
+    gl = uint(h[13])
+    hh = uint(h[14])
+    hl = uint(h[15])
+
+    for i in range(80):
+        # temp1 = hh + S1(e) + ch(e, f, g) + K[i] + w[i]
+        th = ((eh >> 14) | (el << 18)) ^ ((eh >> 18) | (el << 14)) ^ ((el >> 9) | (eh << 23))
+        tl = ((el >> 14) | (eh << 18)) ^ ((el >> 18) | (eh << 14)) ^ ((eh >> 9) | (el << 23))
+        xh = gh ^ (eh & (fh ^ gh))
+        xl = gl ^ (el & (fl ^ gl))
+        lo = tl + xl
+        th = th + xh + (((tl >> 1) + (xl >> 1) + (tl & xl & 1)) >> 31)
+        tl = lo
+        lo = tl + hl
+        th = th + hh + (((tl >> 1) + (hl >> 1) + (tl & hl & 1)) >> 31)
+        tl = lo
+        xh = uint(k[2 * i])
+        xl = uint(k[2 * i + 1])
+        lo = tl + xl
+        th = th + xh + (((tl >> 1) + (xl >> 1) + (tl & xl & 1)) >> 31)
+        tl = lo
+        xh = uint(w[2 * i])
+        xl = uint(w[2 * i + 1])
+        lo = tl + xl
+        th = th + xh + (((tl >> 1) + (xl >> 1) + (tl & xl & 1)) >> 31)
+        tl = lo
+
+        # temp2 = S0(a) + maj(a, b, c)
+        sh = ((ah >> 28) | (al << 4)) ^ ((al >> 2) | (ah << 30)) ^ ((al >> 7) | (ah << 25))
+        sl = ((al >> 28) | (ah << 4)) ^ ((ah >> 2) | (al << 30)) ^ ((ah >> 7) | (al << 25))
+        xh = (ah & bh) | (ch & (ah | bh))
+        xl = (al & bl) | (cl & (al | bl))
+        lo = sl + xl
+        sh = sh + xh + (((sl >> 1) + (xl >> 1) + (sl & xl & 1)) >> 31)
+        sl = lo
+
+        hh = gh
+        hl = gl
+        gh = fh
+        gl = fl
+        fh = eh
+        fl = el
+        # e = d + temp1
+        lo = dl + tl
+        eh = dh + th + (((dl >> 1) + (tl >> 1) + (dl & tl & 1)) >> 31)
+        el = lo
+        dh = ch
+        dl = cl
+        ch = bh
+        cl = bl
+        bh = ah
+        bl = al
+        # a = temp1 + temp2
+        lo = tl + sl
+        ah = th + sh + (((tl >> 1) + (sl >> 1) + (tl & sl & 1)) >> 31)
+        al = lo
+
+    xl = uint(h[1])
+    lo = xl + al
+    h[0] = uint(h[0]) + ah + (((xl >> 1) + (al >> 1) + (xl & al & 1)) >> 31)
+    h[1] = lo
+    xl = uint(h[3])
+    lo = xl + bl
+    h[2] = uint(h[2]) + bh + (((xl >> 1) + (bl >> 1) + (xl & bl & 1)) >> 31)
+    h[3] = lo
+    xl = uint(h[5])
+    lo = xl + cl
+    h[4] = uint(h[4]) + ch + (((xl >> 1) + (cl >> 1) + (xl & cl & 1)) >> 31)
+    h[5] = lo
+    xl = uint(h[7])
+    lo = xl + dl
+    h[6] = uint(h[6]) + dh + (((xl >> 1) + (dl >> 1) + (xl & dl & 1)) >> 31)
+    h[7] = lo
+    xl = uint(h[9])
+    lo = xl + el
+    h[8] = uint(h[8]) + eh + (((xl >> 1) + (el >> 1) + (xl & el & 1)) >> 31)
+    h[9] = lo
+    xl = uint(h[11])
+    lo = xl + fl
+    h[10] = uint(h[10]) + fh + (((xl >> 1) + (fl >> 1) + (xl & fl & 1)) >> 31)
+    h[11] = lo
+    xl = uint(h[13])
+    lo = xl + gl
+    h[12] = uint(h[12]) + gh + (((xl >> 1) + (gl >> 1) + (xl & gl & 1)) >> 31)
+    h[13] = lo
+    xl = uint(h[15])
+    lo = xl + hl
+    h[14] = uint(h[14]) + hh + (((xl >> 1) + (hl >> 1) + (xl & hl & 1)) >> 31)
+    h[15] = lo
+
+class sha512:
+    """Streaming SHA-512 on top of the viper compression function"""
+    digest_size = 64
+    block_size = 128
+
+    def __init__(self, data=b""):
+        if not _ready:
+            _init()
+        self._state = array('I', _H0)
+        self._buffer = bytearray(128)
+        self._buflen = 0
+        self._counter = 0
+        if data:
+            self.update(data)
+
+    def update(self, data):
+        mv = memoryview(data)
+        n = len(mv)
+        self._counter += n
+        pos = 0
+
+        if self._buflen:
+            pos = min(128 - self._buflen, n)
+            self._buffer[self._buflen:self._buflen + pos] = mv[:pos]
+            self._buflen += pos
+            if self._buflen < 128:
+                return
+            _compress(self._state, self._buffer, 0)
+            self._buflen = 0
+
+        while n - pos >= 128:
+            _compress(self._state, mv, pos)
+            pos += 128
+
+        if pos < n:
+            self._buflen = n - pos
+            self._buffer[:self._buflen] = mv[pos:]
+
+    def copy(self):
+        other = sha512()
+        other._state = array('I', self._state)
+        other._buffer[:] = self._buffer
+        other._buflen = self._buflen
+        other._counter = self._counter
+        return other
+
+    def digest(self):
+        state = array('I', self._state)
+        buflen = self._buflen
+        end = 128 if buflen < 112 else 256
+        block = bytearray(end)
+        block[:buflen] = self._buffer[:buflen]
+        block[buflen] = 0x80
+        bits = self._counter << 3
+        struct.pack_into(">II", block, end - 8, (bits >> 32) & 0xffffffff, bits & 0xffffffff)
+
+        for offset in range(0, end, 128):
+            _compress(state, block, offset)
+
+        return struct.pack(">16I", *state)
+
+    def hexdigest(self):
+        return self.digest().hex()
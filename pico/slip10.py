@@ -0,0 +1,65 @@
+# slip10.py
+# SLIP-0010 hierarchical key derivation for ed25519. Every step is
+# hardened (ed25519 has no public derivation), so a child key always
+# needs the parent's private key and chain code.
+#
+# Accounts use Solana's path m/44'/501'/n'/0'. The derivation root here is
+# the wallet's own 32-byte seed rather than a BIP-39 mnemonic seed, so the
+# addresses do not match other wallets that use the same path.
+
+import struct
+from sha512 import sha512_digest
+
+HARDENED = 0x80000000
+# m/44'/501', the node every account hangs off
+SOLANA_ROOT = (44, 501)
+
+def _pads(key):
+    if len(key) > 128:
+        key = sha512_digest(key)
+    key = bytes(key) + bytes(128 - len(key))
+    return bytes(b ^ 0x36 for b in key), bytes(b ^ 0x5c for b in key)
+
+def hmac_sha512(key, msg):
+    ipad, opad = _pads(key)
+    return sha512_digest(opad + sha512_digest(ipad + msg))
+
+def master_key(seed):
+    """(key, chain code) of m"""
+    i = hmac_sha512(b"ed25519 seed", bytes(seed))
+    return i[:32], i[32:]
+
+def child_key(node, index):
+    """(key, chain code) of hardened child index of node"""
+    key, chain = node
+    i = hmac_sha512(chain, b"\x00" + key + struct.pack(">I", index | HARDENED))
+    return i[:32], i[32:]
+
+def derive(node, path):
+    for index in path:
+        node = child_key(node, index)
+    return node
+
+def account_path(n):
+    """Path of account n below SOLANA_ROOT"""
+    return (n, 0)
+
+# Test vector 1 of SLIP-0010 for ed25519: (path, chain code, private key)
+KAT_SEED = bytes(range(16))
+KAT = (
+    ((), "90046a93de5380a72b5e45010748567d5ea02bbf6522f979e05c0d8d8ca9fffb",
+         "2b4be7f19ee27bbf30c667b642d5f4aa69fd169872f8fc3059c08ebae2eb19e7"),
+    ((0,), "8b59aa11380b624e81507a27fedda59fea6d0b779a778918a2fd3590e16e9c69",
+           "68e0fe46dfb67e368c75379acec591dad19df3cde26e63b93a8e704f1dade7a3"),
+    ((0, 1), "a320425f77d1b5c2505a6b1b27382b37368ee640e3557c315416801243552f14",
+             "b1d0bad404bf35da785a64ca1ac54b2617211d2777696fbffaf208f746ae84f2"),
+)
+
+def self_test():
+    """True if derivation matches the SLIP-0010 vectors"""
+    m = master_key(KAT_SEED)
+    for path, chain, key in KAT:
+        k, c = derive(m, path)
+        if k.hex() != key or c.hex() != chain:
+            return False
+    return True
@@ -1,66 +1,141 @@
 import uhashlib
-import ujson as json
 import os
-from ed25519_pico import create_solana_wallet,solana_sign_transaction
-import sys
-import utime
+from ed25519_pico import create_solana_wallet,SigningKey
+import walletfile
+import accountfile
+import kdf
+import slip10
+from walletfile import WalletRecord
 WALLET_FILE="wallet.dat"
+ACCOUNTS_FILE="accounts.dat"
 
-def hash(text):
-    hash_object = uhashlib.sha256(text.encode('utf-8'))
-    hex_digest = hash_object.digest()
-    hex_digest_str = "".join("{:02x}".format(b) for b in hex_digest)
-    return hex_digest_str
+# SigningKey of the unlocked wallet, kept until lock_wallet()
+_signing_key=None
+
+# (SHA-256(salt+password), key) for the unlocked wallet, so commands that
+# resend the password skip the PBKDF2 run. Cleared by lock_wallet().
+_session=None
+
+# PBKDF2 iterations for new wallets, calibrated once per boot
+_iterations=None
+
+# HD accounts derived this session, account number -> SigningKey, and the
+# m/44'/501' node they are derived from. Both go at lock_wallet().
+_accounts={}
+_account_root=None
+
+# MAC key of accounts.dat, set by the first unlock after boot. It is not a
+# signing secret, so it outlives lock_wallet() and lets the index answer
+# while locked; until then nothing read from the index can be checked,
+# and account lookups answer "locked".
+_index_key=None
+
+# The parsed wallet.dat, None when there is no wallet. Read from flash on
+# first use and replaced only by create_wallet/delete_wallet.
+_record=None
+_loaded=False
+
+# True while wallet.dat is there but cannot be parsed. _record is None then,
+# and only delete_wallet/create_wallet, which replace the file, get past it.
+_corrupt=False
+
+def load_record():
+    global _record,_loaded,_corrupt
+    if not _loaded:
+        try:
+            _record=walletfile.read(WALLET_FILE)
+            _corrupt=False
+        except (ValueError,KeyError):
+            _record=None
+            _corrupt=True
+        _loaded=True
+    return _record
+
+def wallet_corrupt():
+    load_record()
+    return _corrupt
+
+def invalidate_record():
+    """Forget the cached record, e.g. after wallet.dat was changed elsewhere"""
+    global _record,_loaded,_index_key
+    _index_key=None
+    _record=None
+    _loaded=False
+
+def _set_record(record):
+    global _record,_loaded,_index_key,_corrupt
+    _index_key=None
+    _record=record
+    _loaded=True
+    _corrupt=False
 
 def hex_bytes(hex):
     return bytes.fromhex(hex)
 
-def generate_privatekey():
-    return os.urandom(32).hex()
+def derive_key(password,record=None):
+    """Encryption key for password under the record's KDF"""
+    password=str(password).encode('utf-8')
+    if record is not None and record.kdf==walletfile.KDF_PBKDF2_SHA256:
+        return kdf.pbkdf2_hmac_sha256(password,record.salt,record.iterations)
+    return uhashlib.sha256(password).digest()
+
+def kdf_iterations():
+    global _iterations
+    if _iterations is None:
+        _iterations=kdf.calibrate()
+    return _iterations
+
+def _session_tag(record,password):
+    return uhashlib.sha256(record.salt+str(password).encode('utf-8')).digest()
 
-def xor_encrypt(msg,k):
-    key=hex_bytes(k)
-    message=hex_bytes(msg)
-    result = bytes([message[i]^key[i%len(key)] for i in range(len(message))])
-    return result.hex()
+def check_password(password):
+    """(record, key) if password opens the wallet, else None"""
+    record=load_record()
+    if record is None:
+        return None
+    if _session is not None and kdf.equal(_session[0],_session_tag(record,password)):
+        return record,_session[1]
+    key=derive_key(password,record)
+    if not walletfile.verify(record,key):
+        return None
+    return record,key
 
-def xor_decrypt(msg,k):
-    key=hex_bytes(k)
-    message=hex_bytes(msg)
-    result = bytes([message[i]^key[i%len(key)] for i in range(len(message))])
-    return result.hex()
+def _new_record(name,password,seed,publickey):
+    """Sealed record for seed under a fresh salt and the calibrated PBKDF2 cost"""
+    record=WalletRecord(name,os.urandom(kdf.SALT_SIZE),walletfile.KDF_PBKDF2_SHA256,
+        kdf_iterations(),b"",publickey)
+    key=derive_key(password,record)
+    walletfile.seal(record,key,seed)
+    return record,key
 
-def create_wallet(name,password,password2):
-    data=read_file()
-    if data=="None" or not data:
+def create_wallet(name,password,password2,progress=None):
+    """progress(text) is called with status updates while the key is made"""
+    global _index_key
+    if load_record() is None:
         walletname=str(name)
         walletpasswd=str(password)
         walletpasswd2=str(password2)
+        if len(walletname.encode())>255:
+            return "nametoolong"
         if walletpasswd==walletpasswd2:
-            print("generating key please wait")
-            sys.stdout.write("gen_key\n")
-            
-            # ✅ ADD BREATHING ROOM - LET PICO PROCESS
-            for i in range(10):
-                print(f"Step {i+1}/10...")
-                utime.sleep(6)  # 60 seconds total but with breathing
-                
+            if progress:
+                progress("gen_key")
+
             private_key,public_key=create_solana_wallet()
             
-            print("done generating")
-            sys.stdout.write("done_gen\n")
+            if progress:
+                progress("done_gen")
             
-            with open(WALLET_FILE, "w") as file:
-                wallet_data={
-                    "name":walletname,
-                    "passhash":str(hash(walletpasswd)),
-                    "privatekey": xor_encrypt(private_key,str(hash(walletpasswd))),
-                    "publickey":public_key
-                }
-                w=json.dumps(wallet_data)
-                file.write(str(w))
+            if progress:
+                progress("derive_key")
+            seed=bytearray(hex_bytes(private_key))
+            record,_=_new_record(walletname,walletpasswd,seed,hex_bytes(public_key))
+            walletfile.write(WALLET_FILE,record)
+            _set_record(record)
+            _index_key=accountfile.index_key(seed)
+            walletfile.wipe(seed)
+            private_key=""
                 
-            sys.stdout.write("created\n")
             return "created"
         else:
             return("different password please try again")
@@ -68,51 +143,149 @@ def create_wallet(name,password,password2):
         return("walletexist")
 
 def delete_wallet(password):
-    data=read_file()
-    if not data or data=="None":
-        return None
-    
-    with open(WALLET_FILE, "r") as file:
-        data=file.read()
-    data=json.loads(data)
-    hashed=hash(str(password))
-
-    if (hashed==data["passhash"])==True:
-        with open(WALLET_FILE, "w") as file:
-            file.write("None")
+    if load_record() is None:
+        if not _corrupt:
+            return None
+        # No password can be checked against a record that does not parse;
+        # removing the file is the only way back to a working device
+        lock_wallet()
+        walletfile.remove(WALLET_FILE)
+        accountfile.remove(ACCOUNTS_FILE)
+        _set_record(None)
+        return 0
+
+    if check_password(password) is not None:
+        lock_wallet()
+        walletfile.remove(WALLET_FILE)
+        accountfile.remove(ACCOUNTS_FILE)
+        _set_record(None)
         return 0
     else:
         return "wrongpass"
-    
-def read_file():
-    with open(WALLET_FILE,"r") as file:
-        data=file.read()
-    data=data.strip()
-    return data
 
 def get_private_key(password):
-    data=read_file()
-    if not data or data=="None":
+    opened=check_password(password)
+    if opened is None:
         return None
-    data=json.loads(data)
-    hashed=hash(str(password))
+    seed=walletfile.open_seed(*opened)
+    private_key=seed.hex()
+    walletfile.wipe(seed)
+    return private_key
 
-    if (hashed==data["passhash"])==True:
-        encrypted_key=data["privatekey"]
-        decrypted_key=xor_decrypt(encrypted_key,hashed)
-        return str(decrypted_key)
-    else:
+def get_name():
+    record=load_record()
+    if record is None:
         return None
+    return record.name
 
-def get_name():
-    data = read_file()
-    if not data or data == "None":
+def get_public_key():
+    """The 32-byte public key, or None without a wallet"""
+    record=load_record()
+    if record is None:
+        return None
+    return record.publickey
+
+def _upgrade(record,password,seed):
+    """Re-seal an older wallet under PBKDF2 and ChaCha20-Poly1305, returns (record, key)"""
+    new,key=_new_record(record.name,password,seed,record.publickey)
+    walletfile.write(WALLET_FILE,new)
+    _set_record(new)
+    return new,key
+
+def get_signing_key(password):
+    """SigningKey for the wallet, derived on first unlock and then cached
+
+    The first unlock also starts the session (see _session) and moves a
+    wallet still on the old SHA-256 key or XOR format to the current one.
+    """
+    global _signing_key,_session,_index_key
+    opened=check_password(password)
+    if opened is None:
         return None
+    if _signing_key is None:
+        record,key=opened
+        seed=walletfile.open_seed(record,key)
+        if record.kdf==walletfile.KDF_SHA256 or record.version<walletfile.VERSION:
+            record,key=_upgrade(record,password,seed)
+        _signing_key=SigningKey(seed)
+        _session=(_session_tag(record,password),key)
+        _index_key=accountfile.index_key(seed)
+        walletfile.wipe(seed)
+    return _signing_key
 
-    try:
-        data_dict = json.loads(data)
-        name = data_dict.get("name", None)
-        return name
-    except:
+def lock_wallet():
+    """Wipe the cached SigningKeys and end the session"""
+    global _signing_key,_session,_account_root
+    _session=None
+    _account_root=None
+    for key in _accounts.values():
+        key.wipe()
+    _accounts.clear()
+    if _signing_key is not None:
+        _signing_key.wipe()
+        _signing_key=None
+
+def sign_transaction(password,message):
+    """Sign a serialized Solana message, returns the 64-byte signature"""
+    key=get_signing_key(password)
+    if key is None:
+        return None
+    return key.sign(message)
+
+def _account_key(n):
+    """SigningKey of account n for the unlocked wallet, derived on first use"""
+    global _account_root
+    key=_accounts.get(n)
+    if key is not None:
+        return key
+    record=load_record()
+    if _account_root is None:
+        seed=walletfile.open_seed(record,_session[1])
+        _account_root=slip10.derive(slip10.master_key(seed),slip10.SOLANA_ROOT)
+        walletfile.wipe(seed)
+    child,chain=slip10.derive(_account_root,slip10.account_path(n))
+    key=SigningKey(child)
+    _accounts[n]=key
+    # Also rewrites a slot that is missing, fails its tag or disagrees
+    if accountfile.lookup(ACCOUNTS_FILE,record.publickey,_index_key,n)!=key.public_key:
+        accountfile.store(ACCOUNTS_FILE,record.publickey,_index_key,n,key.public_key)
+    return key
+
+def valid_account(n):
+    return 0<=n<accountfile.MAX_ACCOUNTS
+
+def indexed_public_key(n):
+    """Account n's public key without deriving it, None if that is not possible"""
+    record=load_record()
+    if record is None or not valid_account(n) or _index_key is None:
         return None
+    key=_accounts.get(n)
+    if key is not None:
+        return key.public_key
+    return accountfile.lookup(ACCOUNTS_FILE,record.publickey,_index_key,n)
 
+def get_account_public_key(n):
+    """Public key of HD account n, None when it needs deriving and the wallet is locked"""
+    if not valid_account(n):
+        return "badaccount"
+    publickey=indexed_public_key(n)
+    if publickey is None and _session is not None:
+        publickey=_account_key(n).public_key
+    return publickey
+
+def list_accounts(start=0,limit=accountfile.MAX_ACCOUNTS):
+    """[(n, public key)] of the accounts derived so far, None until the index can be checked"""
+    record=load_record()
+    if record is None:
+        return []
+    if _index_key is None:
+        return None
+    return accountfile.entries(ACCOUNTS_FILE,record.publickey,_index_key,start,limit)
+
+def sign_with_account(password,n,message):
+    """Sign message with HD account n, returns the 64-byte signature"""
+    if not valid_account(n):
+        return "badaccount"
+    if get_signing_key(password) is None:
+        return None
+    return _account_key(n).sign(message)
@@ -0,0 +1,176 @@
+# walletfile.py
+# On-flash wallet record. Fixed layout, big-endian:
+#
+#   magic "PPWL" (4) | version (1) | name length (1) | salt (16) |
+#   kdf id (1) | kdf iterations (4) | name | nonce (12) |
+#   public key (32) | encrypted seed (32) | tag (16)
+#
+# The seed is sealed with ChaCha20-Poly1305 under the password-derived
+# key, with everything before it as associated data, so the tag checks
+# the password and the file together.
+# Version 1 records have no nonce, keep the seed before the public key,
+# XORed with the key, and end in an HMAC-SHA256 (32) over the rest; they
+# are still read, and wallet.py rewrites them as version 2 on unlock.
+# Records are written to a temp file that is then renamed over the old
+# one, so a power loss leaves either the old or the new wallet intact.
+# Wallets in the original JSON format are converted on first read.
+
+import os
+import struct
+import uhashlib
+import ujson as json
+import chacha20poly1305 as aead
+from kdf import hmac_sha256,equal
+
+MAGIC=b"PPWL"
+VERSION=2
+HEADER=">4sBB16sBI"
+HEADER_SIZE=struct.calcsize(HEADER)
+SEED_SIZE=32
+KEY_SIZE=32
+MAC_SIZE=32
+NONCE_SIZE=aead.NONCE_SIZE
+TAG_SIZE=aead.TAG_SIZE
+
+# KDF ids; KDF_SHA256 is the original scheme, key = SHA-256(password)
+KDF_SHA256=0
+KDF_PBKDF2_SHA256=1
+
+class WalletRecord:
+    """One wallet; seed is the encrypted seed, mac the tag (HMAC in version 1)"""
+    __slots__=("name","salt","kdf","iterations","seed","publickey","mac","version","nonce")
+
+    def __init__(self,name,salt,kdf,iterations,seed,publickey,mac=b"",version=VERSION,nonce=b""):
+        self.name=name
+        self.salt=salt
+        self.kdf=kdf
+        self.iterations=iterations
+        self.seed=seed
+        self.publickey=publickey
+        self.mac=mac
+        self.version=version
+        self.nonce=nonce
+
+def body(record):
+    """Everything the tag covers besides the seed (version 1: the MAC)"""
+    name=record.name.encode()
+    header=struct.pack(HEADER,MAGIC,record.version,len(name),record.salt,record.kdf,record.iterations)+name
+    if record.version==1:
+        return header+record.seed+record.publickey
+    return header+record.nonce+record.publickey
+
+def dump(record):
+    """The record as stored in wallet.dat"""
+    if record.version==1:
+        return body(record)+record.mac
+    return body(record)+record.seed+record.mac
+
+def wipe(buf):
+    for i in range(len(buf)):
+        buf[i]=0
+
+def seal(record,key,seed):
+    """Encrypt seed into record under key with a fresh nonce"""
+    record.version=VERSION
+    record.nonce=os.urandom(NONCE_SIZE)
+    buf=bytearray(seed)
+    record.mac=aead.encrypt(key,record.nonce,buf,body(record))
+    record.seed=bytes(buf)
+
+def open_seed(record,key):
+    """The decrypted seed as a bytearray (wipe() it after use), None if key is wrong"""
+    if record.version==1:
+        if not equal(hmac_sha256(_mac_key(key),body(record)),record.mac):
+            return None
+        buf=bytearray(record.seed)
+        for i in range(SEED_SIZE):
+            buf[i]^=key[i]
+        return buf
+    buf=bytearray(record.seed)
+    if not aead.decrypt(key,record.nonce,buf,record.mac,body(record)):
+        return None
+    return buf
+
+def verify(record,key):
+    seed=open_seed(record,key)
+    if seed is None:
+        return False
+    wipe(seed)
+    return True
+
+def _mac_key(key):
+    # Separate from the encryption key derived from the same password
+    return uhashlib.sha256(b"picopot-mac"+key).digest()
+
+def parse(data):
+    mv=memoryview(data)
+    if len(mv)<HEADER_SIZE:
+        raise ValueError("short wallet file")
+    magic,version,name_len,salt,kdf,iterations=struct.unpack_from(HEADER,mv,0)
+    if magic!=MAGIC or version not in (1,VERSION):
+        raise ValueError("unknown wallet format")
+    pos=HEADER_SIZE
+    if version==1:
+        size=SEED_SIZE+KEY_SIZE+MAC_SIZE
+    else:
+        size=NONCE_SIZE+KEY_SIZE+SEED_SIZE+TAG_SIZE
+    if len(mv)!=pos+name_len+size:
+        raise ValueError("bad wallet file length")
+    name=str(bytes(mv[pos:pos+name_len]),"utf-8")
+    pos+=name_len
+    nonce=b""
+    if version==1:
+        seed=bytes(mv[pos:pos+SEED_SIZE])
+        pos+=SEED_SIZE
+    else:
+        nonce=bytes(mv[pos:pos+NONCE_SIZE])
+        pos+=NONCE_SIZE
+    publickey=bytes(mv[pos:pos+KEY_SIZE])
+    pos+=KEY_SIZE
+    if version!=1:
+        seed=bytes(mv[pos:pos+SEED_SIZE])
+        pos+=SEED_SIZE
+    return WalletRecord(name,bytes(salt),kdf,iterations,seed,publickey,bytes(mv[pos:]),version,nonce)
+
+def _from_json(data):
+    # passhash is SHA-256(password), which is also the XOR key of the
+    # old format, so a version 1 MAC can be computed without the password
+    d=json.loads(data)
+    key=bytes.fromhex(d["passhash"])
+    record=WalletRecord(d["name"],bytes(16),KDF_SHA256,0,
+        bytes.fromhex(d["privatekey"]),bytes.fromhex(d["publickey"]),version=1)
+    record.mac=hmac_sha256(_mac_key(key),body(record))
+    return record
+
+def read(path):
+    """The record in path, or None when there is no wallet"""
+    try:
+        with open(path,"rb") as file:
+            data=file.read()
+    except OSError:
+        return None
+    if not data.strip() or data.strip()==b"None":
+        return None
+    if data[:1]==b"{":
+        record=_from_json(data)
+        write(path,record)
+        return record
+    return parse(data)
+
+def write(path,record):
+    tmp=path+".tmp"
+    with open(tmp,"wb") as file:
+        file.write(dump(record))
+    # rename replaces the old file in one step on littlefs; CPython on
+    # Windows needs replace() for that
+    getattr(os,"replace",os.rename)(tmp,path)
+
+def clean(path):
+    """Remove the temporary file of a write() to path that power loss cut short"""
+    remove(path+".tmp")
+
+def remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass